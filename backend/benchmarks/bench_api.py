@@ -0,0 +1,246 @@
+"""Teste de carga das rotas da API sobre um backend em memória com corpus sintético.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_api --corpus 10000 --concurrency 16 --duration 20
+    python -m benchmarks.bench_api --corpus 1000000 --mix search=50,category=20,deep=10,detail=20 \
+        --output resultado.json
+    python -m benchmarks.bench_api --corpus 100000 --baseline resultado.json
+
+    # contra um servidor já no ar (ex.: gunicorn com o mesmo backend em memória)
+    BENCH_CORPUS_SIZE=100000 gunicorn -c gunicorn.conf.py 'benchmarks.bench_api:make_app()'
+    python -m benchmarks.bench_api --url http://127.0.0.1:5001 --corpus 100000
+
+Sem --url, o script cria a aplicação com create_app(backend=StandInBackend(N))
+e a serve em uma thread (servidor do Werkzeug com threads). Os clientes
+repetem, durante --duration segundos, uma mistura de requisições com os
+pesos de --mix:
+
+- search: GET /convenios com um termo do vocabulário, páginas 1 a 3;
+- category: GET /convenios filtrado por uma categoria;
+- deep: segue o next_cursor de GET /convenios por --deep-pages páginas;
+- detail: GET /convenio/<id> de um convênio sorteado;
+- categories: GET /get_categories.
+
+O resultado traz, por tipo de requisição e no total, a vazão (req/s), os
+erros e as latências p50/p95/p99 em ms, em JSON (--output grava em arquivo).
+Com --baseline, compara com um resultado anterior e mostra a variação.
+--no-cache desliga os caches de resposta para medir o caminho completo.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.corpus import CATEGORIES, WORDS
+
+DEFAULT_MIX = "search=50,category=20,deep=10,detail=15,categories=5"
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def make_app(size=None):
+    """Aplicação com o backend em memória; tamanho do corpus em BENCH_CORPUS_SIZE."""
+    from benchmarks.stand_in_backend import StandInBackend
+    from server.app import create_app
+
+    size = size or int(os.getenv("BENCH_CORPUS_SIZE", 10000))
+    return create_app(backend=StandInBackend(size))
+
+
+def serve(app, port):
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Client:
+    def __init__(self, base_url, corpus_size, deep_pages, seed, results):
+        self.base_url = base_url
+        self.corpus_size = corpus_size
+        self.deep_pages = deep_pages
+        self.rng = random.Random(seed)
+        self.results = results
+
+    def get(self, kind, path, params=None):
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                body = response.read()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            body, ok = b"", False
+        elapsed = (time.perf_counter() - started) * 1000
+        self.results.setdefault(kind, {"latencies": [], "errors": 0})
+        if ok:
+            self.results[kind]["latencies"].append(elapsed)
+        else:
+            self.results[kind]["errors"] += 1
+        return body
+
+    def search(self):
+        self.get("search", "/convenios", {
+            "search": self.rng.choice(WORDS), "page": self.rng.randint(1, 3), "view": "list",
+        })
+
+    def category(self):
+        self.get("category", "/convenios", {"category": self.rng.choice(CATEGORIES), "view": "list"})
+
+    def deep(self):
+        params = {"sort_by": "date", "order": "desc", "view": "list"}
+        for _ in range(self.deep_pages):
+            body = self.get("deep", "/convenios", params)
+            try:
+                cursor = json.loads(body).get("next_cursor")
+            except ValueError:
+                return
+            if not cursor:
+                return
+            params = {**params, "cursor": cursor}
+
+    def detail(self):
+        self.get("detail", f"/convenio/bench-{self.rng.randrange(self.corpus_size)}")
+
+    def categories(self):
+        self.get("categories", "/get_categories")
+
+
+def run_clients(args, base_url, mix):
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    per_client = []
+    deadline = time.perf_counter() + args.duration
+
+    def worker(seed):
+        results = {}
+        per_client.append(results)
+        client = Client(base_url, args.corpus, args.deep_pages, seed, results)
+        while time.perf_counter() < deadline:
+            getattr(client, client.rng.choices(kinds, weights)[0])()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged = {}
+    for results in per_client:
+        for kind, result in results.items():
+            target = merged.setdefault(kind, {"latencies": [], "errors": 0})
+            target["latencies"].extend(result["latencies"])
+            target["errors"] += result["errors"]
+    merged["total"] = {
+        "latencies": [value for result in merged.values() for value in result["latencies"]],
+        "errors": sum(result["errors"] for result in merged.values()),
+    }
+    return {
+        kind: {
+            "requests": len(result["latencies"]),
+            "errors": result["errors"],
+            "req_per_sec": round(len(result["latencies"]) / elapsed, 1),
+            "p50_ms": round(percentile(result["latencies"], 0.50), 3),
+            "p95_ms": round(percentile(result["latencies"], 0.95), 3),
+            "p99_ms": round(percentile(result["latencies"], 0.99), 3),
+        }
+        for kind, result in merged.items()
+    }
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        kind, weight = part.split("=")
+        if kind not in ("search", "category", "deep", "detail", "categories"):
+            raise SystemExit(f"Tipo de requisição desconhecido em --mix: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def compare(result, baseline):
+    """Linhas com a variação de vazão e p95 em relação a um resultado anterior."""
+    lines = []
+    for kind, current in result["routes"].items():
+        previous = baseline.get("routes", {}).get(kind)
+        if not previous:
+            continue
+        throughput = (current["req_per_sec"] / previous["req_per_sec"] - 1) * 100 if previous["req_per_sec"] else 0.0
+        p95 = (current["p95_ms"] / previous["p95_ms"] - 1) * 100 if previous["p95_ms"] else 0.0
+        lines.append(f"{kind:>10}: vazão {throughput:+7.1f}%  p95 {p95:+7.1f}%")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=10000, help="Convênios sintéticos no backend em memória")
+    parser.add_argument("--url", default=None, help="Usa um servidor já no ar em vez de subir um")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos de carga")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos por tipo de requisição")
+    parser.add_argument("--deep-pages", type=int, default=20, help="Páginas seguidas por cursor no tipo deep")
+    parser.add_argument("--no-cache", action="store_true", help="Desliga os caches de resposta")
+    parser.add_argument("--output", default=None, help="Grava o resultado JSON neste arquivo")
+    parser.add_argument("--baseline", default=None, help="Resultado JSON anterior para comparação")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        # Lidas na importação de server.cache e server.responses
+        for name in ("CONVENIOS_CACHE_TTL", "SUGGEST_CACHE_TTL", "CATEGORIES_CACHE_TTL", "COMPRESSED_CACHE_TTL"):
+            os.environ[name] = "0"
+
+    mix = parse_mix(args.mix)
+    build_seconds = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        started = time.perf_counter()
+        app = make_app(args.corpus)
+        build_seconds = round(time.perf_counter() - started, 3)
+        serve(app, args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    result = {
+        "corpus": args.corpus,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "mix": mix,
+        "no_cache": args.no_cache,
+        "setup_s": build_seconds,
+        "routes": run_clients(args, base_url, mix),
+    }
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            for line in compare(result, json.load(f)):
+                print(line, file=sys.stderr)
+    return 1 if result["routes"]["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
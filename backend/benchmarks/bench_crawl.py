@@ -0,0 +1,202 @@
+"""Benchmark ponta a ponta da coleta, reproduzindo uma coleta gravada, sem rede.
+
+Uso (a partir de backend/):
+
+    # 1. Grava uma coleta (do site ou do servidor local de benchmarks.listing_server)
+    python -m benchmarks.bench_crawl --archive /tmp/caadf --record
+
+    # 2. Reproduz pelo spider -> pipeline -> indexador configurados
+    python -m benchmarks.bench_crawl --archive /tmp/caadf
+    python -m benchmarks.bench_crawl --archive /tmp/caadf --no-index --json
+    python -m benchmarks.bench_crawl --archive /tmp/caadf --min-items-per-sec 200
+
+A gravação usa o cache HTTP do Scrapy (ver myspider_project/archive.py).
+Na reprodução, a coleta roda inteira no processo, com os pipelines de
+ITEM_PIPELINES (Meilisearch ou Postgres, conforme SEARCH_BACKEND) a menos
+que --no-index seja usado, e reporta:
+
+- itens/s de ponta a ponta (do início da coleta ao fechamento do spider,
+  incluindo a espera pelo indexador);
+- tempo por etapa: leitura do arquivo (fetch), callbacks do spider (parse),
+  permanência dos itens nos pipelines (pipeline) e envio ao indexador
+  (index), com totais e médias.
+
+Com --min-items-per-sec o script termina com código 1 abaixo do limite.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(BACKEND_DIR, "myspider_project")
+sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "myspider_project.settings")
+
+from scrapy import signals  # noqa: E402
+from scrapy.crawler import CrawlerProcess  # noqa: E402
+from scrapy.utils.project import get_project_settings  # noqa: E402
+
+from myspider_project.spiders.convenio_spider import ConvenioSpider  # noqa: E402
+
+
+class StageTimer:
+    """Acumula durações por etapa."""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    def add(self, stage, seconds, count=1):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + count
+
+    def report(self):
+        return {
+            stage: {
+                "count": self.counts[stage],
+                "total_s": round(total, 4),
+                "avg_ms": round(total / self.counts[stage] * 1000, 3) if self.counts[stage] else 0.0,
+            }
+            for stage, total in self.totals.items()
+        }
+
+
+timer = StageTimer()
+
+
+class FetchTimingMiddleware:
+    """Mede o tempo de cada requisição na camada de download (na reprodução, a leitura do arquivo).
+
+    O Scrapy carrega o middleware pelo caminho benchmarks.bench_crawl, que com
+    `python -m` é outra cópia do módulo, diferente de __main__; por isso os
+    tempos vão para as estatísticas do crawler, e não para o `timer` global.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+
+    def process_request(self, request, spider):
+        request.meta["bench_fetch_started"] = time.perf_counter()
+
+    def process_response(self, request, response, spider):
+        started = request.meta.get("bench_fetch_started")
+        if started is not None:
+            self.stats.inc_value("bench/fetch_seconds", time.perf_counter() - started, start=0.0)
+            self.stats.inc_value("bench/fetch_count")
+        return response
+
+
+class TimedConvenioSpider(ConvenioSpider):
+    """O spider de produção, com os callbacks cronometrados e a saída dos itens marcada."""
+
+    def parse(self, response):
+        return self._timed(super().parse(response))
+
+    def parse_convenio(self, response):
+        return self._timed(super().parse_convenio(response))
+
+    def _timed(self, results):
+        started = time.perf_counter()
+        results = list(results)
+        timer.add("parse", time.perf_counter() - started)
+        now = time.perf_counter()
+        for result in results:
+            if isinstance(result, dict):
+                self.item_started[result["id"]] = now
+        return results
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.item_started = {}
+        crawler.signals.connect(spider.item_done, signal=signals.item_scraped)
+        crawler.signals.connect(spider.item_done, signal=signals.item_dropped)
+        return spider
+
+    def item_done(self, item, **kwargs):
+        started = self.item_started.pop(item.get("id"), None)
+        if started is not None:
+            timer.add("pipeline", time.perf_counter() - started)
+
+
+def run(args):
+    settings = get_project_settings()
+    settings.set("CRAWL_ARCHIVE_MODE", "record" if args.record else "replay", priority="cmdline")
+    settings.set("CRAWL_ARCHIVE_DIR", os.path.abspath(args.archive), priority="cmdline")
+    settings.set("LOG_LEVEL", "ERROR", priority="cmdline")
+    middlewares = dict(settings.getdict("DOWNLOADER_MIDDLEWARES"))
+    # Logo antes do HttpCacheMiddleware (900), para medir a leitura do arquivo
+    middlewares["benchmarks.bench_crawl.FetchTimingMiddleware"] = 899
+    settings.set("DOWNLOADER_MIDDLEWARES", middlewares, priority="cmdline")
+    if args.no_index or args.record:
+        settings.set("ITEM_PIPELINES", {}, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(TimedConvenioSpider)
+    started = time.perf_counter()
+    process.crawl(crawler, start_url=args.start_url)
+    process.start()
+    elapsed = time.perf_counter() - started
+
+    stats = crawler.stats.get_stats()
+    if "bench/fetch_count" in stats:
+        timer.add("fetch", stats["bench/fetch_seconds"], count=stats["bench/fetch_count"])
+    for stage, key in (
+        ("index", "meilisearch/send_seconds"),
+        ("index", "postgres/write_seconds"),
+        ("index_wait", "meilisearch/wait_seconds"),
+    ):
+        if key in stats:
+            timer.add(stage, stats[key], count=0)
+
+    items = stats.get("item_scraped_count", 0)
+    return {
+        "mode": "record" if args.record else "replay",
+        "indexing": not (args.no_index or args.record),
+        "finish_reason": stats.get("finish_reason"),
+        "requests": stats.get("downloader/request_count", 0),
+        "cache_hits": stats.get("httpcache/hit", 0),
+        "cache_misses": stats.get("httpcache/miss", 0),
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "items_per_sec": round(items / elapsed, 1) if elapsed else 0.0,
+        "stages": timer.report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", required=True, help="Diretório do arquivo da coleta")
+    parser.add_argument("--record", action="store_true", help="Grava a coleta (usa a rede) em vez de reproduzir")
+    parser.add_argument("--start-url", default=None, help="Origem da coleta (padrão: a do spider)")
+    parser.add_argument("--no-index", action="store_true", help="Reproduz sem pipelines de indexação")
+    parser.add_argument("--min-items-per-sec", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"{result['mode']}: {result['items']} itens em {result['seconds']}s = {result['items_per_sec']} itens/s "
+            f"({result['requests']} requisições, {result['cache_hits']} do arquivo, {result['cache_misses']} ausentes)"
+        )
+        for stage, timing in result["stages"].items():
+            print(f"{stage:>12}: {timing['total_s']:>9.3f} s  {timing['avg_ms']:>9.3f} ms/op  ({timing['count']} ops)")
+
+    if args.min_items_per_sec is not None and result["items_per_sec"] < args.min_items_per_sec:
+        print(f"Regressão: abaixo de {args.min_items_per_sec} itens/s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Benchmark do parser de convênios sobre páginas salvas da CAADF.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_parse
+    python -m benchmarks.bench_parse --iterations 2000 --min-pages-per-sec 500
+    python -m benchmarks.bench_parse --record https://www.caadf.org.br/convenios/<slug>/
+
+Mede duas etapas para cada página em benchmarks/fixtures/caadf/:
+
+- extract: só myspider_project.extraction.extract_convenio sobre o HTML de `.entry`;
+- parse_convenio: o callback completo do spider, incluindo os seletores CSS.
+
+Para cada etapa reporta páginas/s e o pico de memória alocada por página
+(tracemalloc). Com --min-pages-per-sec o script termina com código 1 se o
+parse_convenio ficar abaixo do limite, para pegar regressões offline.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "myspider_project"))
+
+from parsel import Selector  # noqa: E402
+from scrapy.http import HtmlResponse  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+
+from myspider_project.extraction import extract_convenio  # noqa: E402
+from myspider_project.spiders.convenio_spider import ConvenioSpider  # noqa: E402
+
+FIXTURES_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "caadf")
+
+
+def load_fixtures():
+    pages = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+            body = f.read()
+        url = f"https://www.caadf.org.br/convenios/{name[:-5]}/"
+        pages.append((url, body))
+    return pages
+
+
+def record(urls):
+    """Salva as páginas informadas como novas fixtures."""
+    for url in urls:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            body = response.read()
+        slug = url.rstrip("/").rsplit("/", 1)[-1]
+        path = os.path.join(FIXTURES_DIR, f"{slug}.html")
+        with open(path, "wb") as f:
+            f.write(body)
+        print(f"Fixture salva: {path} ({len(body)} bytes)")
+
+
+def measure(name, func, inputs, iterations):
+    # Aquecimento, para não medir a compilação de seletores e caches
+    for value in inputs:
+        func(value)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for value in inputs:
+            func(value)
+    elapsed = time.perf_counter() - start
+    pages = iterations * len(inputs)
+
+    tracemalloc.start()
+    for value in inputs:
+        func(value)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "stage": name,
+        "pages": pages,
+        "seconds": round(elapsed, 4),
+        "pages_per_sec": round(pages / elapsed, 1),
+        "peak_kib_per_page": round(peak / 1024 / len(inputs), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--min-pages-per-sec", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    parser.add_argument("--record", nargs="+", metavar="URL", help="Baixa páginas para usar como fixtures")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        return 0
+
+    # O spider loga um aviso por página; no benchmark isso só atrapalha
+    logging.disable(logging.WARNING)
+
+    pages = load_fixtures()
+    if not pages:
+        print(f"Nenhuma fixture encontrada em {FIXTURES_DIR}")
+        return 1
+
+    spider = ConvenioSpider.from_crawler(get_crawler(ConvenioSpider))
+    responses = [HtmlResponse(url=url, body=body, encoding="utf-8") for url, body in pages]
+    entries = []
+    for _, body in pages:
+        selector = Selector(text=body.decode("utf-8"))
+        entries.append((selector.css(".entry").get(), selector.css(".tie-date::text").get()))
+
+    results = [
+        measure("extract", lambda entry: extract_convenio(*entry), entries, args.iterations),
+        # Uma HtmlResponse nova a cada chamada, para não reaproveitar o DOM já parseado
+        measure(
+            "parse_convenio",
+            lambda response: list(spider.parse_convenio(response.replace())),
+            responses,
+            args.iterations,
+        ),
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(
+                f"{result['stage']:>15}: {result['pages_per_sec']:>10.1f} páginas/s  "
+                f"{result['peak_kib_per_page']:>8.1f} KiB/página  ({result['pages']} páginas em {result['seconds']}s)"
+            )
+
+    if args.min_pages_per_sec is not None and results[-1]["pages_per_sec"] < args.min_pages_per_sec:
+        print(f"Regressão: parse_convenio abaixo de {args.min_pages_per_sec} páginas/s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
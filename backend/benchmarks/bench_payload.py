@@ -0,0 +1,59 @@
+"""Tamanho e custo de serialização das páginas de busca, por visão.
+
+Uso (a partir de backend/, com o backend de busca configurado e populado):
+
+    python -m benchmarks.bench_payload --runs 20
+    SEARCH_BACKEND=postgres python -m benchmarks.bench_payload --search academia
+
+Para view=full e view=list, busca a mesma página pelo backend configurado,
+mede o tamanho do JSON e o tempo de json.dumps da resposta, e a latência
+média da busca em --runs execuções.
+"""
+
+import argparse
+import json
+import time
+
+from server.backends import get_backend
+
+
+def measure(backend, args, view):
+    search_times, dump_times, size = [], [], 0
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        result = backend.search(args.search, 1, args.page_size, "title", "asc", None, view=view)
+        search_times.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        body = json.dumps({"data": result["hits"]}, ensure_ascii=False, default=str)
+        dump_times.append((time.perf_counter() - started) * 1000)
+        size = len(body.encode("utf-8"))
+    return {
+        "view": view,
+        "bytes": size,
+        "search_ms": round(sum(search_times) / len(search_times), 3),
+        "dumps_ms": round(sum(dump_times) / len(dump_times), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--search", default="desconto")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    backend = get_backend()
+    results = [measure(backend, args, view) for view in ("full", "list")]
+    for result in results:
+        print(
+            f"{result['view']:>4}: {result['bytes']:>9} bytes  busca {result['search_ms']:>8.3f} ms  "
+            f"json.dumps {result['dumps_ms']:>7.3f} ms"
+        )
+    full, listing = results
+    if listing["bytes"]:
+        print(f"list/full: {listing['bytes'] / full['bytes']:.2%} do tamanho")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Vazão de busca do servidor HTTP com concorrência crescente.
+
+Uso (a partir de backend/), com o servidor já no ar:
+
+    # servidor de desenvolvimento
+    python -m server.app
+    # ou produção, variando processos e threads
+    WEB_WORKERS=4 WEB_THREADS=8 gunicorn -c gunicorn.conf.py server.wsgi:app
+
+    python -m benchmarks.bench_serving --url http://127.0.0.1:5001 --concurrency 1,8,32,64 --duration 10
+
+Para cada nível de concorrência, --concurrency clientes fazem requisições
+GET /convenios em sequência durante --duration segundos, com buscas e
+páginas sorteadas de uma lista fixa (parte repetida, parte não, para não
+medir só o cache de respostas). O resultado é a vazão (req/s) e as
+latências p50/p95/p99 de cada nível; compare a curva do servidor de
+desenvolvimento com a do gunicorn em diferentes WEB_WORKERS/WEB_THREADS.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+TERMS = ["", "academia", "odontologia", "curso", "desconto", "faculdade", "hotel", "clínica", "idiomas", "ótica"]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def client(base_url, deadline, seed, latencies, errors):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        params = {"search": rng.choice(TERMS), "page": rng.randint(1, 5), "page_size": 10}
+        url = f"{base_url}/convenios?{urllib.parse.urlencode(params)}"
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except Exception:
+            errors.append(url)
+
+
+def run_level(base_url, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(base_url, deadline, n, latencies, errors))
+        for n in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5001")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="Níveis de concorrência, separados por vírgula")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por nível")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    results = [run_level(args.url.rstrip("/"), int(level), args.duration) for level in args.concurrency.split(",")]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(
+                f"{result['concurrency']:>4} clientes: {result['req_per_sec']:>8.1f} req/s  "
+                f"p50 {result['p50_ms']:>7.2f} ms  p95 {result['p95_ms']:>7.2f} ms  "
+                f"p99 {result['p99_ms']:>7.2f} ms  ({result['errors']} erros)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Corpus sintético de convênios, determinístico, compartilhado pelos benchmarks."""
+
+import hashlib
+import random
+
+WORDS = (
+    "academia clínica odontologia faculdade pós-graduação idiomas farmácia ótica hotel "
+    "pousada restaurante livraria seguro consultoria laboratório fisioterapia psicologia "
+    "estética escola curso viagem turismo veterinária pet advocacia contabilidade saúde "
+    "educação lazer desconto mensalidade matrícula consulta exame tratamento plano"
+).split()
+CATEGORIES = ["Saúde", "Educação", "Lazer", "Serviços", "Turismo", "Saúde Animal", "Pós-graduação", "Idiomas"]
+
+
+def sentence(rng, size):
+    return " ".join(rng.choice(WORDS) for _ in range(size))
+
+
+def synthetic_convenios(count, body_words=120, seed=42):
+    """Gera `count` convênios no formato dos itens do spider."""
+    rng = random.Random(seed)
+    for n in range(count):
+        body = sentence(rng, body_words)
+        categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+        item = {
+            "id": f"bench-{n}",
+            "title": f"{sentence(rng, 3).title()} {n}",
+            "date": f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "cats": ", ".join(categories),
+            "categories": categories,
+            "content": f"<div class=\"entry\"><p>{body}</p></div>",
+            "text": body,
+            "discounts": f"{rng.randint(5, 50)}% de desconto em {sentence(rng, 4)}",
+            "url": f"https://convenios.example/convenio-{n}/",
+            "image": None,
+        }
+        item["content_hash"] = hashlib.sha1(f"{item['id']}{body}".encode("utf-8")).hexdigest()
+        yield item
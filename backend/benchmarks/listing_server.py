@@ -0,0 +1,134 @@
+"""Servidor HTTP local que imita a listagem paginada de convênios da CAADF.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.listing_server --pages 100 --per-page 10 --latency 0.05
+
+e, em outro terminal, a partir de backend/myspider_project/:
+
+    scrapy crawl convenio_spider -a start_url=http://127.0.0.1:8000/category/convenios/ \
+        -s ITEM_PIPELINES={} -s LOG_LEVEL=WARNING
+
+Cada página de listagem tem --per-page convênios e a paginação típica do
+tema (links para páginas vizinhas, primeira e última, com variações de URL
+para exercitar a deduplicação). As páginas de convênio usam o HTML das
+fixtures em benchmarks/fixtures/caadf/. --latency atrasa cada resposta, e
+--slow-after faz o servidor ficar lento depois de N requisições, para
+observar a AdaptiveConcurrency reduzindo a concorrência.
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "caadf")
+LISTING_RE = re.compile(r"^/category/convenios/(?:page/(\d+)/)?$")
+CONVENIO_RE = re.compile(r"^/convenios/convenio-(\d+)/$")
+TITLE_RE = re.compile(r'(<span itemprop="name">)[^<]*(</span>)')
+
+
+def load_templates():
+    templates = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                templates.append(f.read())
+    return templates
+
+
+def render_listing(page, pages, per_page):
+    posts = "".join(
+        f'<article class="post-listing"><h2>Convênio {n}</h2>'
+        f'<a class="more-link" href="/convenios/convenio-{n}/">Leia mais</a></article>'
+        for n in range((page - 1) * per_page + 1, page * per_page + 1)
+    )
+    links = []
+    for target in sorted({1, page - 1, page + 1, page + 2, pages}):
+        if 1 <= target <= pages and target != page:
+            # A primeira página aparece com e sem "page/1/", como no WordPress
+            href = "/category/convenios/" if target == 1 else f"/category/convenios/page/{target}/"
+            links.append(f'<a class="page" href="{href}">{target}</a>')
+            if target == 1:
+                links.append('<a class="first" href="/category/convenios/page/1/">«</a>')
+    return (
+        "<html><body><div class=\"content\">"
+        f"{posts}<div class=\"pagination\">{''.join(links)}</div>"
+        "</div></body></html>"
+    )
+
+
+def make_handler(args, templates):
+    counter = {"requests": 0}
+    counter_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *log_args):
+            pass
+
+        def do_GET(self):
+            with counter_lock:
+                counter["requests"] += 1
+                served = counter["requests"]
+            latency = args.latency
+            if args.slow_after and served > args.slow_after:
+                latency = args.slow_latency
+            if latency:
+                time.sleep(latency)
+
+            path = self.path.split("?", 1)[0]
+            if path == "/robots.txt":
+                return self.respond("User-agent: *\nAllow: /\n", "text/plain")
+
+            listing = LISTING_RE.match(path)
+            if listing:
+                page = int(listing.group(1) or 1)
+                if page <= args.pages:
+                    return self.respond(render_listing(page, args.pages, args.per_page))
+
+            convenio = CONVENIO_RE.match(path)
+            if convenio:
+                number = int(convenio.group(1))
+                if number <= args.pages * args.per_page:
+                    template = templates[number % len(templates)]
+                    return self.respond(TITLE_RE.sub(rf"\g<1>Convênio {number}\g<2>", template, count=1))
+
+            self.send_error(404)
+
+        def respond(self, body, content_type="text/html"):
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pages", type=int, default=50, help="Quantidade de páginas de listagem")
+    parser.add_argument("--per-page", type=int, default=10, help="Convênios por página de listagem")
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso por resposta, em segundos")
+    parser.add_argument("--slow-after", type=int, default=0, help="Fica lento depois de N requisições")
+    parser.add_argument("--slow-latency", type=float, default=2.0, help="Atraso depois de --slow-after")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args, load_templates()))
+    print(
+        f"Servindo {args.pages} páginas de listagem ({args.pages * args.per_page} convênios) "
+        f"em http://{args.host}:{args.port}/category/convenios/"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Backend de busca em memória, para medir as rotas sem Meilisearch nem Postgres.
+
+Implementa a interface de server.backends.SearchBackend sobre um corpus
+sintético (benchmarks.corpus): índice invertido por palavra e por
+categoria, e as ordenações por título e data pré-calculadas. A paginação
+por cursor usa offset, como no MeilisearchBackend.
+"""
+
+import time
+from array import array
+
+from benchmarks.corpus import synthetic_convenios
+from server.backends import LIST_FIELDS, SearchBackend
+from server.database import SNIPPET_CHARS
+
+
+class StandInBackend(SearchBackend):
+    name = "stand-in"
+
+    def __init__(self, size, body_words=30):
+        started = time.perf_counter()
+        self.documents = list(synthetic_convenios(size, body_words=body_words))
+        self.by_id = {document["id"]: position for position, document in enumerate(self.documents)}
+        self.postings = {}
+        self.category_postings = {}
+        for position, document in enumerate(self.documents):
+            for word in set(f"{document['title']} {document['text']} {document['discounts']}".lower().split()):
+                self.postings.setdefault(word, array("i")).append(position)
+            for category in document["categories"]:
+                self.category_postings.setdefault(category, array("i")).append(position)
+        # Posição de cada documento em cada ordenação, para ordenar subconjuntos
+        self.orders = {}
+        self.ranks = {}
+        for field in ("title", "date"):
+            order = sorted(range(size), key=lambda position: (self.documents[position][field] or "", position))
+            rank = array("i", [0]) * size
+            for position_in_order, position in enumerate(order):
+                rank[position] = position_in_order
+            self.orders[field] = array("i", order)
+            self.ranks[field] = rank
+        self.build_seconds = round(time.perf_counter() - started, 3)
+
+    def _matches(self, search_text, category):
+        matched = None
+        for word in (search_text or "").lower().split():
+            postings = set(self.postings.get(word, ()))
+            matched = postings if matched is None else matched & postings
+        if category:
+            postings = set(self.category_postings.get(category, ()))
+            matched = postings if matched is None else matched & postings
+        return matched
+
+    def search(
+        self, search_text, page, page_size, sort_by, order, category, suggestions=0, after=None,
+        fields=None, view="full",
+    ):
+        sort_field = sort_by if sort_by in self.orders else "title"
+        offset = after["offset"] if after else (page - 1) * page_size
+        matched = self._matches(search_text, category)
+        if matched is None:
+            ordered = self.orders[sort_field]
+            total = len(ordered)
+            if order == "desc":
+                positions = [ordered[total - 1 - n] for n in range(offset, min(offset + page_size, total))]
+            else:
+                positions = list(ordered[offset:offset + page_size])
+        else:
+            total = len(matched)
+            ordered = sorted(matched, key=self.ranks[sort_field].__getitem__, reverse=order == "desc")
+            positions = ordered[offset:offset + page_size]
+
+        requested = set(fields or (LIST_FIELDS if view == "list" else ())) | {"id"}
+        hits = []
+        for position in positions:
+            document = self.documents[position]
+            hit = {k: v for k, v in document.items() if k in requested} if fields or view == "list" else dict(document)
+            for field in ("title", "discounts") + (("content",) if view == "full" else ()):
+                if field in hit:
+                    hit[f"{field}_highlight"] = hit[field]
+            if view == "list":
+                hit["snippet"] = document["text"][:SNIPPET_CHARS]
+            hits.append(hit)
+
+        next_offset = offset + page_size
+        return {
+            "hits": hits,
+            "total": total,
+            "suggestions": self.suggest(search_text, suggestions) if search_text and suggestions else [],
+            "next_position": {"offset": next_offset} if next_offset < total else None,
+        }
+
+    def suggest(self, search_text, limit):
+        matched = self._matches(search_text, None) or ()
+        return [
+            {"id": self.documents[position]["id"], "title": self.documents[position]["title"]}
+            for position in sorted(matched)[:limit]
+        ]
+
+    def categories(self):
+        return [{"name": name, "count": len(postings)} for name, postings in sorted(self.category_postings.items())]
+
+    def get_convenio(self, id):
+        position = self.by_id.get(id)
+        return dict(self.documents[position]) if position is not None else None
+
+    def export(self, since=None):
+        return iter(self.documents)
+
+    def titles(self):
+        return ({"id": document["id"], "title": document["title"]} for document in self.documents)
@@ -0,0 +1,63 @@
+# Configuração do gunicorn para servir server.wsgi:app em produção.
+#
+#     gunicorn -c gunicorn.conf.py server.wsgi:app
+#
+# Variáveis de ambiente:
+#   WEB_BIND                endereço (padrão 0.0.0.0:5001)
+#   WEB_WORKERS             processos (padrão: número de núcleos)
+#   WEB_THREADS             threads por processo (padrão 8); cada conexão
+#                           WebSocket ocupa uma thread
+#   WEB_TIMEOUT             segundos sem resposta antes de reiniciar o worker (padrão 60)
+#
+# Com WEB_WORKERS > 1, defina SOCKETIO_MESSAGE_QUEUE (ex.: redis://redis:6379/0)
+# para que as emissões de progresso cheguem aos clientes de todos os
+# processos. O frontend conecta o Socket.IO só por WebSocket, então não é
+# preciso sessão fixa (sticky session) entre os processos.
+#
+# Também com WEB_WORKERS > 1, defina PROMETHEUS_MULTIPROC_DIR (ex.:
+# /tmp/prometheus) para que GET /metrics some as métricas de todos os
+# processos, inclusive as do worker de coleta. O diretório é esvaziado ao
+# iniciar o gunicorn.
+
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:5001")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count()))
+# Workers com threads: o crawl worker, o agendador e o Socket.IO usam threads
+# e multiprocessing comuns
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", 8))
+timeout = int(os.getenv("WEB_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    # Uma única vez, no processo mestre, antes de criar os workers
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        # Arquivos de uma execução anterior somariam métricas de processos mortos
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+    from server.database import create_tables
+
+    create_tables()
+
+
+def post_worker_init(worker):
+    # Sobe o processo de coleta junto com cada worker, para a primeira coleta
+    # não pagar a inicialização do Scrapy
+    from server.crawler import crawl_worker
+
+    crawl_worker.start()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,37 @@
+"""Gravação e reprodução de coletas com o cache HTTP do Scrapy.
+
+Com CRAWL_ARCHIVE_MODE=record, cada requisição e resposta (status, headers
+e corpo) é gravada comprimida com gzip em CRAWL_ARCHIVE_DIR, no formato do
+FilesystemCacheStorage. Com CRAWL_ARCHIVE_MODE=replay, a coleta é servida
+só do arquivo: requisições ausentes são ignoradas em vez de irem à rede, e
+os atrasos de cortesia ficam desligados, já que não há servidor do outro lado.
+
+    scrapy crawl convenio_spider -s CRAWL_ARCHIVE_MODE=record -s CRAWL_ARCHIVE_DIR=/tmp/caadf
+    scrapy crawl convenio_spider -s CRAWL_ARCHIVE_MODE=replay -s CRAWL_ARCHIVE_DIR=/tmp/caadf
+"""
+
+ARCHIVE_MODES = ("record", "replay")
+
+
+def archive_settings(mode, archive_dir):
+    """Configurações do Scrapy para gravar ou reproduzir uma coleta."""
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"CRAWL_ARCHIVE_MODE inválido: {mode}")
+    settings = {
+        "HTTPCACHE_ENABLED": True,
+        "HTTPCACHE_DIR": archive_dir,
+        "HTTPCACHE_GZIP": True,
+        "HTTPCACHE_EXPIRATION_SECS": 0,
+        "HTTPCACHE_IGNORE_HTTP_CODES": [],
+        # Grava tudo, inclusive respostas com Cache-Control: no-store
+        "HTTPCACHE_POLICY": "scrapy.extensions.httpcache.DummyPolicy",
+        "HTTPCACHE_STORAGE": "scrapy.extensions.httpcache.FilesystemCacheStorage",
+    }
+    if mode == "replay":
+        settings.update({
+            "HTTPCACHE_IGNORE_MISSING": True,
+            "DOWNLOAD_DELAY": 0,
+            "AUTOTHROTTLE_ENABLED": False,
+            "ADAPTIVE_CONCURRENCY_ENABLED": False,
+        })
+    return settings
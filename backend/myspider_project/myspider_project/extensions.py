@@ -0,0 +1,116 @@
+# Extensões do crawler de convênios
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import logging
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+
+class AdaptiveConcurrency:
+    """Ajusta a concorrência de cada slot do downloader (um por domínio) pela latência.
+
+    Mantém uma média móvel exponencial da latência de download por slot e
+    aplica AIMD: enquanto a média fica abaixo de ADAPTIVE_CONCURRENCY_TARGET_LATENCY
+    a concorrência sobe de um em um até ADAPTIVE_CONCURRENCY_MAX; se passar do
+    dobro do alvo, ou o servidor responder 429/5xx, ela cai pela metade até
+    ADAPTIVE_CONCURRENCY_MIN.
+
+    Só funciona sem atraso entre requisições: com DOWNLOAD_DELAY > 0 ou com o
+    AutoThrottle, o slot envia uma requisição por intervalo, qualquer que seja
+    a concorrência.
+    """
+
+    # Peso da latência mais recente na média móvel
+    SMOOTHING = 0.3
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured
+        self.crawler = crawler
+        self.target_latency = settings.getfloat("ADAPTIVE_CONCURRENCY_TARGET_LATENCY")
+        self.min_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_MIN")
+        self.max_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_MAX")
+        if settings.getbool("AUTOTHROTTLE_ENABLED") or settings.getfloat("DOWNLOAD_DELAY") > 0:
+            logging.warning(
+                "AdaptiveConcurrency ativa com DOWNLOAD_DELAY ou AutoThrottle: "
+                "o atraso entre requisições limita a vazão e a concorrência ajustada não tem efeito"
+            )
+        self.latencies = {}
+        crawler.signals.connect(self.response_received, signal=signals.response_received)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def response_received(self, response, request, spider):
+        key = request.meta.get("download_slot")
+        latency = request.meta.get("download_latency")
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is None or latency is None:
+            return
+
+        average = self.latencies.get(key, latency)
+        average += self.SMOOTHING * (latency - average)
+        self.latencies[key] = average
+
+        concurrency = slot.concurrency
+        if response.status == 429 or response.status >= 500 or average > 2 * self.target_latency:
+            concurrency = max(self.min_concurrency, concurrency // 2)
+        elif average < self.target_latency:
+            concurrency = min(self.max_concurrency, concurrency + 1)
+
+        if concurrency != slot.concurrency:
+            slot.concurrency = concurrency
+            self.crawler.stats.set_value(f"adaptive_concurrency/{key}", concurrency)
+            self.crawler.stats.max_value("adaptive_concurrency/max", concurrency)
+
+
+class CrawlThroughputStats:
+    """Registra a vazão da coleta (páginas e itens por minuto) nas stats e no log.
+
+    A cada CRAWL_THROUGHPUT_INTERVAL segundos grava throughput/pages_per_min e
+    throughput/items_per_min, calculados desde o início da coleta.
+    """
+
+    def __init__(self, stats, interval):
+        self.stats = stats
+        self.interval = interval
+        self.started_at = None
+        self.loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        interval = crawler.settings.getfloat("CRAWL_THROUGHPUT_INTERVAL")
+        if not interval:
+            raise NotConfigured
+        extension = cls(crawler.stats, interval)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        self.started_at = time.monotonic()
+        self.loop = task.LoopingCall(self.record, spider)
+        self.loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.loop and self.loop.running:
+            self.loop.stop()
+        self.record(spider)
+
+    def record(self, spider):
+        minutes = max(time.monotonic() - self.started_at, 1e-6) / 60
+        pages = self.stats.get_value("response_received_count", 0)
+        items = self.stats.get_value("item_scraped_count", 0)
+        self.stats.set_value("throughput/pages_per_min", round(pages / minutes, 1))
+        self.stats.set_value("throughput/items_per_min", round(items / minutes, 1))
+        logging.warning(
+            f"Vazão: {pages} páginas ({pages / minutes:.1f}/min), "
+            f"{items} itens ({items / minutes:.1f}/min)"
+        )
@@ -0,0 +1,86 @@
+"""Extração do conteúdo das páginas de convênio da CAADF.
+
+Todos os padrões são compilados uma única vez no carregamento do módulo e
+cada página é processada em uma sequência curta de passadas: corta o
+rodapé, remove o ruído (scripts, comentários, estilos inline) em uma única
+substituição, normaliza os espaços e então extrai texto, descontos e imagem
+do HTML já sanitizado.
+"""
+
+import re
+
+# Tudo a partir deste marcador é rodapé do post (compartilhamento, relacionados)
+FOOTER_MARKER = '<div class="clear">'
+
+# Scripts, estilos, iframes, comentários e atributos style inline em uma única passada
+NOISE_RE = re.compile(
+    r'<(script|style|iframe|noscript)\b[^>]*>.*?</\1>'
+    r'|<!--.*?-->'
+    r'|\s+style="[^"]*"',
+    re.IGNORECASE | re.DOTALL,
+)
+WHITESPACE_RE = re.compile(r'\s+')
+TAG_RE = re.compile(r'<[^>]*>')
+DISCOUNTS_RE = re.compile(
+    r'<strong>Descontos?:?\s*</strong>(.*?)</p>|'  # Captura descontos simples
+    r'Descontos?:?\s*(.*?)</p>|'  # Captura descontos simples sem <strong>
+    r'(<p>\s*(?:I|II|III|IV|V|VI|VII|VIII|IX|X)[^<]*<br>.*?)</p>',  # Captura listas enumeradas
+    re.IGNORECASE | re.DOTALL,
+)
+# Primeira imagem dentro de um link, equivalente a `.entry a img::attr(src)`
+IMAGE_RE = re.compile(r'<a\b[^>]*>(?:(?!</a>).)*?<img\b[^>]*?\ssrc="([^"]*)"', re.IGNORECASE | re.DOTALL)
+
+
+def sanitize_html(content):
+    """Remove rodapé, ruído e espaços redundantes do HTML do post."""
+    footer = content.find(FOOTER_MARKER)
+    if footer != -1:
+        content = content[:footer] + "</div>"
+    content = NOISE_RE.sub("", content)
+    return WHITESPACE_RE.sub(" ", content).strip()
+
+
+def strip_tags(html):
+    return TAG_RE.sub("", html).strip()
+
+
+def extract_discounts(html):
+    """Retorna o texto de cada trecho de desconto encontrado no HTML."""
+    discounts = []
+    for match in DISCOUNTS_RE.finditer(html):
+        discount_text = match.group(1) or match.group(2) or match.group(3)
+        if discount_text:
+            discounts.append(strip_tags(discount_text))
+    return discounts
+
+
+def extract_image(html):
+    match = IMAGE_RE.search(html)
+    return match.group(1) if match else None
+
+
+def parse_date(date):
+    """Converte a data do formato brasileiro (dd/mm/aaaa) para aaaa-mm-dd, ordenável."""
+    if not date:
+        return ""
+    date_parts = date.strip().split("/")
+    if len(date_parts) != 3:
+        return ""
+    return f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
+
+
+def extract_convenio(content, date=None):
+    """Extrai de uma vez todos os campos derivados do HTML de `.entry`.
+
+    Retorna um dicionário com content (HTML sanitizado), text, discounts,
+    date e image.
+    """
+    content = content or ""
+    sanitized = sanitize_html(content)
+    return {
+        "content": sanitized,
+        "text": strip_tags(sanitized),
+        "discounts": ", ".join(extract_discounts(sanitized)),
+        "date": parse_date(date),
+        "image": extract_image(sanitized),
+    }
@@ -3,11 +3,217 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
+import json
+import time
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from meilisearch import Client
+from scrapy import signals
+from twisted.internet import defer, threads
+
+from server import database
+from server.indexer import TaskTracker, apply_index_settings, ensure_index, fetch_document_hashes
+
+
+def removed_ids(existing_ids, seen_ids, spider, reason):
+    """IDs que sumiram do site e podem sair do índice, ou None se a coleta não viu o catálogo todo.
+
+    Só uma coleta terminada normalmente e sem páginas de listagem perdidas vê
+    todos os convênios. Os convênios cuja página de detalhe falhou de vez
+    (spider.failed_convenios) continuam no índice: não foram vistos, mas
+    ainda podem existir.
+    """
+    if reason != "finished" or getattr(spider, "failed_listings", 0):
+        return None
+    failed = getattr(spider, "failed_convenios", set())
+    return [doc_id for doc_id in existing_ids if doc_id not in seen_ids and doc_id not in failed]
 
 
 class MyspiderProjectPipeline:
     def process_item(self, item, spider):
         return item
+
+
+class MeilisearchPipeline:
+    """Envia os itens ao Meilisearch em lotes enquanto o spider roda.
+
+    Um lote é enviado quando atinge MEILISEARCH_BATCH_SIZE documentos ou
+    MEILISEARCH_BATCH_BYTES bytes serializados. Os envios acontecem em uma
+    thread, um de cada vez, e o item que disparou o envio só é liberado
+    quando o lote foi aceito; se houver mais de MEILISEARCH_MAX_PENDING_TASKS
+    tarefas de indexação pendentes, o envio espera a mais antiga terminar.
+    Assim o Scrapy desacelera a coleta quando o Meilisearch não acompanha.
+
+    Itens cujo content_hash não mudou não são reenviados, e ao final de uma
+    coleta completa os documentos que não apareceram são removidos.
+    """
+
+    def __init__(self, url, api_key, index_name, batch_size, batch_bytes, max_pending_tasks, task_timeout_ms, stats=None):
+        self.client = Client(url, api_key)
+        self.index_name = index_name
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.max_pending_tasks = max_pending_tasks
+        self.stats = stats
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.tasks = TaskTracker(self.client, task_timeout_ms)
+        self.existing_hashes = {}
+        self.seen_ids = set()
+        self.send_lock = defer.DeferredLock()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        pipeline = cls(
+            url=settings.get("MEILISEARCH_URL"),
+            api_key=settings.get("MEILISEARCH_API_KEY"),
+            index_name=settings.get("MEILISEARCH_INDEX"),
+            batch_size=settings.getint("MEILISEARCH_BATCH_SIZE"),
+            batch_bytes=settings.getint("MEILISEARCH_BATCH_BYTES"),
+            max_pending_tasks=settings.getint("MEILISEARCH_MAX_PENDING_TASKS"),
+            task_timeout_ms=settings.getint("MEILISEARCH_TASK_TIMEOUT_MS"),
+            stats=crawler.stats,
+        )
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        ensure_index(self.client, self.index_name)
+        # Configurações antes dos documentos, para não indexar o corpus duas vezes
+        apply_index_settings(self.client, self.index_name)
+        self.index = self.client.index(self.index_name)
+        self.existing_hashes = fetch_document_hashes(self.index)
+
+    def process_item(self, item, spider):
+        document = ItemAdapter(item).asdict()
+        self.seen_ids.add(document["id"])
+
+        if self.existing_hashes.get(document["id"]) == document.get("content_hash"):
+            self._inc_stat("meilisearch/unchanged")
+            return item
+
+        # Momento da última mudança, usado pela exportação incremental (since=)
+        document["updated_at"] = int(time.time())
+        self.buffer.append(document)
+        self.buffer_bytes += len(json.dumps(document, ensure_ascii=False).encode("utf-8"))
+        if len(self.buffer) < self.batch_size and self.buffer_bytes < self.batch_bytes:
+            return item
+
+        d = self._flush()
+        d.addCallback(lambda _: item)
+        return d
+
+    def close_spider(self, spider):
+        return self._flush()
+
+    def spider_closed(self, spider, reason):
+        # Só remove documentos ausentes se a coleta viu todo o catálogo
+        removed = removed_ids(self.existing_hashes, self.seen_ids, spider, reason)
+        if removed is None and reason == "finished":
+            self._inc_stat("meilisearch/removal_skipped")
+        return self.send_lock.run(threads.deferToThread, self._finish, removed or [])
+
+    def _flush(self):
+        if not self.buffer:
+            return defer.succeed(None)
+        batch, self.buffer, self.buffer_bytes = self.buffer, [], 0
+        return self.send_lock.run(threads.deferToThread, self._send_batch, batch)
+
+    def _send_batch(self, batch):
+        started = time.perf_counter()
+        while len(self.tasks) >= self.max_pending_tasks:
+            self.tasks.wait_oldest()
+        self.tasks.track(self.index.add_documents(batch))
+        self._inc_stat("meilisearch/documents_sent", len(batch))
+        self._inc_stat("meilisearch/batches_sent")
+        self._inc_stat("meilisearch/send_seconds", time.perf_counter() - started)
+
+    def _finish(self, removed):
+        started = time.perf_counter()
+        if removed:
+            self.tasks.track(self.index.delete_documents(removed))
+            self._inc_stat("meilisearch/removed", len(removed))
+        self.tasks.wait_all()
+        self._inc_stat("meilisearch/wait_seconds", time.perf_counter() - started)
+
+    def _inc_stat(self, key, count=1):
+        if self.stats:
+            self.stats.inc_value(key, count)
+
+
+class PostgresPipeline:
+    """Grava os itens no Postgres em lotes com database.bulk_upsert_convenios.
+
+    Itens com o mesmo content_hash já gravado são descartados antes do envio;
+    os demais vão em lotes de POSTGRES_BATCH_SIZE, um de cada vez em uma
+    thread, segurando o item que disparou o lote até ele ser gravado. Ao final
+    de uma coleta completa, os convênios que não apareceram são removidos.
+    """
+
+    def __init__(self, batch_size, stats=None):
+        self.batch_size = batch_size
+        self.stats = stats
+        self.buffer = []
+        self.existing_hashes = {}
+        self.seen_ids = set()
+        self.write_lock = defer.DeferredLock()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(crawler.settings.getint("POSTGRES_BATCH_SIZE"), crawler.stats)
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        database.create_tables()
+        self.existing_hashes = database.get_content_hashes()
+
+    def process_item(self, item, spider):
+        row = ItemAdapter(item).asdict()
+        self.seen_ids.add(row["id"])
+
+        if self.existing_hashes.get(row["id"]) == row.get("content_hash"):
+            self._inc_stat("postgres/unchanged")
+            return item
+
+        self.buffer.append(row)
+        if len(self.buffer) < self.batch_size:
+            return item
+
+        d = self._flush()
+        d.addCallback(lambda _: item)
+        return d
+
+    def close_spider(self, spider):
+        return self._flush()
+
+    def spider_closed(self, spider, reason):
+        removed = removed_ids(self.existing_hashes, self.seen_ids, spider, reason)
+        if removed is None:
+            if reason == "finished":
+                self._inc_stat("postgres/removal_skipped")
+            return None
+        return self.write_lock.run(threads.deferToThread, self._delete, removed)
+
+    def _flush(self):
+        if not self.buffer:
+            return defer.succeed(None)
+        batch, self.buffer = self.buffer, []
+        return self.write_lock.run(threads.deferToThread, self._write, batch)
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        stats = database.bulk_upsert_convenios(batch, self.batch_size)
+        self._inc_stat("postgres/write_seconds", time.perf_counter() - started)
+        self._inc_stat("postgres/inserted", stats["inserted"])
+        self._inc_stat("postgres/updated", stats["updated"])
+        self._inc_stat("postgres/batches_written")
+
+    def _delete(self, removed):
+        self._inc_stat("postgres/removed", database.delete_convenios(removed))
+
+    def _inc_stat(self, key, count=1):
+        if self.stats:
+            self.stats.inc_value(key, count)
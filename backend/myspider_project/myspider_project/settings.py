@@ -7,6 +7,8 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
 BOT_NAME = "myspider_project"
 
 SPIDER_MODULES = ["myspider_project.spiders"]
@@ -20,14 +22,18 @@ NEWSPIDER_MODULE = "myspider_project.spiders"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-#CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS = 32
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
+# Sem atraso: com DOWNLOAD_DELAY > 0 o Scrapy envia uma requisição por
+# intervalo em cada slot, e a concorrência ajustada pela AdaptiveConcurrency
+# deixaria de ter efeito
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
+# (concorrência inicial por domínio; a AdaptiveConcurrency ajusta a partir daqui)
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
 #CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -56,19 +62,53 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+    "myspider_project.extensions.AdaptiveConcurrency": 500,
+    "myspider_project.extensions.CrawlThroughputStats": 510,
+}
+
+# Concorrência por domínio ajustada pela latência (ver AdaptiveConcurrency)
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_TARGET_LATENCY = 1.0
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 16
+
+# Intervalo, em segundos, do registro de vazão (ver CrawlThroughputStats)
+CRAWL_THROUGHPUT_INTERVAL = 10
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
-#    "myspider_project.pipelines.MyspiderProjectPipeline": 300,
-#}
+# O destino segue o backend de busca do servidor (SEARCH_BACKEND)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "meilisearch")
+ITEM_PIPELINES = {
+    "myspider_project.pipelines.PostgresPipeline" if SEARCH_BACKEND == "postgres"
+    else "myspider_project.pipelines.MeilisearchPipeline": 300,
+}
+
+# Indexação em streaming no Meilisearch (ver MeilisearchPipeline)
+MEILISEARCH_URL = os.getenv("MEILISEARCH_URL", "http://localhost:7700")
+MEILISEARCH_API_KEY = os.getenv("MEILISEARCH_API_KEY", "masterKey")
+MEILISEARCH_INDEX = "convenios"
+# Um lote é enviado ao atingir qualquer um dos dois limites
+MEILISEARCH_BATCH_SIZE = 200
+MEILISEARCH_BATCH_BYTES = 2 * 1024 * 1024
+# Máximo de tarefas de indexação pendentes antes de segurar a coleta
+MEILISEARCH_MAX_PENDING_TASKS = 4
+MEILISEARCH_TASK_TIMEOUT_MS = 60000
+
+# Carga em lote no Postgres (ver PostgresPipeline)
+POSTGRES_BATCH_SIZE = 500
+
+# Gravação ("record") ou reprodução ("replay") da coleta em disco, para
+# benchmarks sem rede (ver myspider_project/archive.py)
+CRAWL_ARCHIVE_MODE = None
+CRAWL_ARCHIVE_DIR = "crawl_archive"
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
-#AUTOTHROTTLE_ENABLED = True
+# Desligado: o ritmo da coleta fica com a AdaptiveConcurrency, e o atraso que o
+# AutoThrottle impõe a cada slot anularia o ajuste da concorrência
+AUTOTHROTTLE_ENABLED = False
 # The initial download delay
 #AUTOTHROTTLE_START_DELAY = 5
 # The maximum download delay to be set in case of high latencies
@@ -1,6 +1,43 @@
+import hashlib
+import json
 import logging
 import scrapy
-import re
+from scrapy import signals
+from urllib.parse import urlsplit, urlunsplit
+
+from myspider_project.archive import archive_settings
+from myspider_project.extraction import extract_convenio
+
+
+# Campos que definem se um convênio mudou entre duas coletas
+HASHED_FIELDS = ("title", "date", "cats", "categories", "content", "discounts", "text", "image")
+# Categorias genéricas que todo post da listagem tem
+IGNORED_CATEGORIES = ("Convênios", "Destaques")
+
+
+def canonical_url(url):
+    """Normaliza a URL do convênio (esquema, host, barra final, sem query/fragmento)."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") + "/"
+    return urlunsplit(("https", parts.netloc.lower(), path, "", ""))
+
+
+def listing_key(url):
+    """Chave de deduplicação das páginas de listagem ("page/1/" é a própria primeira página)."""
+    url = canonical_url(url)
+    return url[:-len("page/1/")] if url.endswith("/page/1/") else url
+
+
+def stable_id(url):
+    """ID estável derivado da URL canônica, para que os links /convenio/<id> sobrevivam às recoletas."""
+    return hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()
+
+
+def content_hash(item):
+    """Hash do conteúdo do item, usado para detectar convênios alterados."""
+    payload = {key: item.get(key) for key in HASHED_FIELDS}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
 
 class ConvenioSpider(scrapy.Spider):
     name = "convenio_spider"
@@ -9,15 +46,42 @@ class ConvenioSpider(scrapy.Spider):
 
     custom_settings = {
         'LOG_LEVEL': 'WARNING',  # Apenas logs WARN ou superiores
-        'FEEDS': {
-            'output/convenios.json': {
-                'format': 'json',
-                'encoding': 'utf8',
-                'indent': 4,
-            },
-        },
     }
 
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        # Gravação/reprodução da coleta (ver myspider_project.archive)
+        mode = settings.get("CRAWL_ARCHIVE_MODE")
+        if mode:
+            settings.setdict(archive_settings(mode, settings.get("CRAWL_ARCHIVE_DIR")), priority="spider")
+
+    def __init__(self, start_url=None, *args, **kwargs):
+        """`start_url` permite apontar o spider para outra origem, como um servidor local de testes."""
+        super().__init__(*args, **kwargs)
+        if start_url:
+            self.start_urls = [start_url]
+            self.allowed_domains = [urlsplit(start_url).hostname]
+        # URLs canônicas já agendadas, para não repetir listagens e convênios
+        # que aparecem com variações (barra final, query string, http/https)
+        self.seen_listings = set()
+        self.seen_convenios = set()
+        # IDs dos convênios cuja página de detalhe falhou de vez (depois das
+        # novas tentativas) e páginas de listagem perdidas; os pipelines não
+        # removem o que a coleta não conseguiu ver
+        self.failed_convenios = set()
+        self.failed_listings = 0
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.callback_failed, signal=signals.spider_error)
+        return spider
+
+    def start_requests(self):
+        for url in self.start_urls:
+            yield scrapy.Request(url, callback=self.parse, errback=self.listing_failed, dont_filter=True)
+
     def truncate_message(self, message, max_length=300):
         """Trunca mensagens longas."""
         if len(message) > max_length:
@@ -26,70 +90,81 @@ class ConvenioSpider(scrapy.Spider):
 
     def parse(self, response):
         logging.warning(self.truncate_message(f"Acessando: {response.url}"))
+        self.seen_listings.add(listing_key(response.url))
+        self.crawler.stats.inc_value("convenios/listing_pages")
+
         links = response.css('.content .post-listing .more-link::attr(href)').getall()
         pages = response.css('.pagination a::attr(href)').getall()
 
         for link in links:
-            yield response.follow(link, callback=self.parse_convenio)
+            url = canonical_url(response.urljoin(link))
+            if self._first_visit(url, self.seen_convenios):
+                yield response.follow(
+                    link, callback=self.parse_convenio, errback=self.detail_failed,
+                    meta={"convenio_id": stable_id(url)},
+                )
+
+        for page in pages:
+            if self._first_visit(listing_key(response.urljoin(page)), self.seen_listings):
+                yield response.follow(page, callback=self.parse, errback=self.listing_failed)
 
-        # for page in pages:
-            # yield response.follow(page, callback=self.parse)
+    def _first_visit(self, key, seen):
+        if key in seen:
+            self.crawler.stats.inc_value("convenios/duplicates_skipped")
+            return False
+        seen.add(key)
+        return True
+
+    def listing_failed(self, failure):
+        self.failed_listings += 1
+        self.crawler.stats.inc_value("convenios/listing_failures")
+        logging.error(self.truncate_message(f"Falha na listagem {failure.request.url}: {failure.value!r}"))
+
+    def detail_failed(self, failure):
+        self.failed_convenios.add(failure.request.meta["convenio_id"])
+        self.crawler.stats.inc_value("convenios/detail_failures")
+        logging.error(self.truncate_message(f"Falha no convênio {failure.request.url}: {failure.value!r}"))
+
+    def callback_failed(self, failure, response, spider):
+        """Erro ao processar uma página baixada: conta como falha do convênio ou da listagem."""
+        convenio_id = response.meta.get("convenio_id")
+        if convenio_id:
+            self.failed_convenios.add(convenio_id)
+            self.crawler.stats.inc_value("convenios/detail_failures")
+        else:
+            self.failed_listings += 1
+            self.crawler.stats.inc_value("convenios/listing_failures")
 
     def parse_convenio(self, response):
         logging.warning(self.truncate_message(f"Extraindo convênio: {response.url}"))
+        self.crawler.stats.inc_value("convenios/detail_pages")
 
         title = response.css('h1 span::text').get()
         date = response.css('.tie-date::text').get()
         cats = response.css('.post-cats a::text').getall()
         content = response.css('.entry').get()
-        image = response.css('.entry a img::attr(src)').get()
-
-        # Regex para capturar descontos
-        discounts_regex = (
-            r'<strong>Descontos?:?\s*</strong>(.*?)<\/p>|'  # Captura descontos simples
-            r'Descontos?:?\s*(.*?)<\/p>|'  # Captura descontos simples sem <strong>
-            r'(<p>\s*(I|II|III|IV|V|VI|VII|VIII|IX|X)[^<]*<br>.*?)<\/p>'  # Captura listas enumeradas
-        )
-        discounts = re.findall(discounts_regex, content, re.IGNORECASE | re.DOTALL)
-
-        clean_discounts = []
-        if discounts:
-            for d in discounts:
-                discount_text = d[0] or d[1] or d[2]
-                if discount_text:
-                    clean_discounts.append(re.sub(r'<[^>]*>', '', discount_text).strip())
-
-           # Remover HTML desnecessário e caracteres redundantes
-        sanitized_content = re.sub(r'<(script|style|iframe|noscript)[^>]*>.*?</\1>', '', content, flags=re.DOTALL)
-        sanitized_content = re.sub(r'<!--.*?-->', '', sanitized_content, flags=re.DOTALL)
-        sanitized_content = re.sub(r'\t+', ' ', sanitized_content)
-        sanitized_content = re.sub(r'\n+', ' ', sanitized_content)
-        sanitized_content = re.sub(r'\s{2,}', ' ', sanitized_content).strip()
-        sanitized_content = re.sub(r'<div class="clear">.*', '</div>', content, flags=re.DOTALL)
-        
-        content_text = re.sub(r'<[^>]*>', '', sanitized_content)
-
-        #parse from brazilian date format to sortable date
-        sortable_date = None
-        if date:
-            date_parts = date.split("/")
-            if len(date_parts) == 3:
-                sortable_date = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
-                
-        #remove all inline styles from content, to avoid conflicts with frontend styles
-        regex = r'style="[^"]*"'
-        content = re.sub(regex, '', content)
-    
+
+        # HTML sanitizado, texto, descontos, data e imagem em uma única extração
+        extracted = extract_convenio(content, date)
+
+        # Categorias normalizadas na coleta: sem espaços, sem repetição, na ordem da página
+        categories = list(dict.fromkeys(c.strip() for c in cats if c.strip() and c.strip() not in IGNORED_CATEGORIES))
+
+        url = canonical_url(response.url)
         item = {
+            "id": stable_id(url),
             "title": (title or "").strip(),
-            "date": (sortable_date or "").strip(),
-            "cats": ", ".join(c.strip() for c in cats if c.strip() not in ["Convênios", "Destaques"]) if cats else "",
-            "content": (sanitized_content or "").strip(),
-            "discounts": ", ".join(clean_discounts) if clean_discounts else "",
-            "text": (content_text or "").strip(),
-            "url": response.url,
-            "image": image,
+            "date": extracted["date"],
+            "cats": ", ".join(categories),
+            # Lista usada como faceta e filtro no Meilisearch e em convenio_categories no Postgres
+            "categories": categories,
+            "content": extracted["content"],
+            "discounts": extracted["discounts"],
+            "text": extracted["text"],
+            "url": url,
+            "image": extracted["image"],
         }
+        item["content_hash"] = content_hash(item)
 
         yield item
 
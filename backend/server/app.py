@@ -1,26 +1,69 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 from server.routes import routes_bp
+from server.backends import set_backend
+from server.metrics import init_metrics
+from server.profiling import init_profiling
 from flask_socketio import SocketIO
 from server.database import create_tables
+from server.crawler import crawl_worker
 import logging
 
-app = Flask(__name__)
+# Origem do frontend liberada no CORS e no Socket.IO
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+# Fila de mensagens do Socket.IO (ex.: redis://redis:6379/0); necessária com
+# mais de um worker, para que uma emissão chegue aos clientes de todos eles
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE") or None
+# Modo assíncrono do Socket.IO ("threading" nos workers gthread); sem valor, o Flask-SocketIO detecta pelo servidor
+SOCKETIO_ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE") or None
 
-# Configurar CORS para permitir localhost:3000
-CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
+socketio = SocketIO()
 
-# Inicialize o SocketIO
-socketio = SocketIO(app, cors_allowed_origins="http://localhost:3000")
 
-# Configure o SocketIO no módulo de rotas
-from server.routes import init_socketio
-init_socketio(socketio)
+def create_app(backend=None):
+    """Cria a aplicação Flask com CORS, Socket.IO e as rotas registradas.
+
+    `backend` substitui o backend de busca de SEARCH_BACKEND (ver server.backends).
+    """
+    app = Flask(__name__)
+    if backend is not None:
+        set_backend(backend)
+
+    # Configurar CORS para permitir o frontend
+    CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}})
+
+    # Inicialize o SocketIO
+    socketio.init_app(
+        app,
+        cors_allowed_origins=CORS_ORIGINS,
+        message_queue=SOCKETIO_MESSAGE_QUEUE,
+        async_mode=SOCKETIO_ASYNC_MODE,
+    )
+
+    # Configure o SocketIO no módulo de rotas
+    from server.routes import init_socketio
+    init_socketio(socketio)
+
+    # Latência por rota e GET /metrics
+    init_metrics(app)
+    # Perfilamento por etapas sob demanda; só existe com PROFILE_SECRET
+    init_profiling(app)
+
+    # Registra as rotas
+    app.register_blueprint(routes_bp)
+
+    # Índice de autocompletar da geração atual, construído em segundo plano
+    from server.autocomplete import autocomplete
+    autocomplete.refresh()
+    return app
 
-# Registra as rotas
-app.register_blueprint(routes_bp)
 
 if __name__ == "__main__":
+    # Servidor de desenvolvimento; em produção use gunicorn com server.wsgi:app
+    app = create_app()
     logging.info("Criando as tabelas no banco de dados...")
     create_tables()
-    socketio.run(app, host="0.0.0.0", port=5001, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    # Sobe o worker de coleta junto com o servidor, para a primeira coleta não pagar a inicialização do Scrapy
+    crawl_worker.start()
+    socketio.run(app, host="0.0.0.0", port=5001, allow_unsafe_werkzeug=True)
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from server.backends import get_backend
+from server.generation import current_generation
+from server.logging import logging
+
+# Caracteres guardados por chave; consultas mais longas são comparadas só até aqui
+KEY_CHARS = int(os.getenv("AUTOCOMPLETE_KEY_CHARS", 48))
+# Chaves examinadas por consulta antes de ordenar; limita o custo de prefixos curtos
+SCAN_LIMIT = 256
+# Máximo de categorias antes dos títulos em cada resposta
+MAX_CATEGORIES = 2
+# Espera antes de tentar de novo depois de uma construção que falhou
+RETRY_SECONDS = 30
+
+
+def fold(value):
+    """Minúsculas, sem acentos e com espaços normalizados ("Clínica  Ótica" -> "clinica otica")."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+
+class AutocompleteIndex:
+    """Índice de prefixos em memória sobre títulos e categorias.
+
+    Cada título entra uma vez por palavra, com a chave começando nela
+    ("clinica sorriso", "sorriso"), para que a consulta case com o início de
+    qualquer palavra. As chaves ficam num array ordenado; uma consulta é uma
+    busca binária seguida da leitura das chaves que começam com o prefixo.
+    O índice é imutável: uma nova geração constrói outro e troca a referência.
+    """
+
+    def __init__(self, titles, categories, generation=None):
+        started = time.perf_counter()
+        self.generation = generation
+        self.entries = []
+        keyed = []
+        for category in categories:
+            position = len(self.entries)
+            self.entries.append({"type": "category", "name": category["name"], "count": category["count"]})
+            keyed.append((fold(category["name"])[:KEY_CHARS], position, 0))
+        self.categories_end = len(self.entries)
+        for document in titles:
+            folded = fold(document.get("title"))
+            if not folded:
+                continue
+            position = len(self.entries)
+            self.entries.append({"type": "convenio", "id": document["id"], "title": document["title"]})
+            word = 0
+            for start in range(len(folded)):
+                if start == 0 or folded[start - 1] == " ":
+                    keyed.append((folded[start:start + KEY_CHARS], position, word))
+                    word += 1
+        keyed.sort()
+        self.keys = [key for key, _, _ in keyed]
+        self.positions = array("i", [position for _, position, _ in keyed])
+        self.words = array("H", [min(word, 65535) for _, _, word in keyed])
+        self.build_seconds = round(time.perf_counter() - started, 3)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def suggest(self, search_text, limit, max_categories=MAX_CATEGORIES):
+        """Categorias e títulos cujo início de palavra casa com o texto digitado.
+
+        Casos no começo do título vêm antes, depois os mais curtos; as
+        categorias, até `max_categories`, vêm antes dos títulos.
+        """
+        prefix = fold(search_text)[:KEY_CHARS]
+        if not prefix:
+            return []
+        best = {}
+        start = bisect_left(self.keys, prefix)
+        for n in range(start, min(start + SCAN_LIMIT, len(self.keys))):
+            if not self.keys[n].startswith(prefix):
+                break
+            position = self.positions[n]
+            rank = self.words[n]
+            if position not in best or rank < best[position]:
+                best[position] = rank
+
+        categories = sorted(
+            (position for position in best if position < self.categories_end),
+            key=lambda position: -self.entries[position]["count"],
+        )[:min(max_categories, limit)]
+        titles = sorted(
+            (position for position in best if position >= self.categories_end),
+            key=lambda position: (best[position] > 0, len(self.entries[position]["title"]), position),
+        )[:limit - len(categories)]
+        return [self.entries[position] for position in categories + titles]
+
+
+class AutocompleteStore:
+    """Guarda o índice da geração atual e o reconstrói quando a geração muda.
+
+    Enquanto o índice de uma nova geração é construído em segundo plano, o
+    anterior continua respondendo; a troca é a atribuição de uma referência.
+    Antes do primeiro índice ficar pronto, current() retorna None e a rota
+    recorre ao backend de busca.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.building = False
+        self.failed_at = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        """O índice pronto mais recente; dispara a reconstrução se a geração mudou."""
+        index = self.index
+        if index is None or index.generation != current_generation():
+            self.refresh()
+        return index
+
+    def refresh(self, wait=False):
+        """Reconstrói o índice a partir do backend de busca, em uma thread (ou nesta, com wait=True)."""
+        with self.lock:
+            if self.building or (self.failed_at and time.monotonic() - self.failed_at < RETRY_SECONDS):
+                return
+            self.building = True
+        if wait:
+            self._build()
+        else:
+            threading.Thread(target=self._build, daemon=True).start()
+
+    def _build(self):
+        generation = current_generation()
+        try:
+            backend = get_backend()
+            index = AutocompleteIndex(backend.titles(), backend.categories(), generation)
+            self.index = index
+            self.failed_at = None
+            logging.info(
+                f"[Autocomplete] Índice da geração {generation}: {len(index)} entradas, "
+                f"{len(index.keys)} chaves em {index.build_seconds}s"
+            )
+        except Exception as e:
+            self.failed_at = time.monotonic()
+            logging.error(f"[Autocomplete] Erro ao construir o índice: {str(e)}")
+        finally:
+            with self.lock:
+                self.building = False
+
+
+autocomplete = AutocompleteStore()
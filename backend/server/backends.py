@@ -0,0 +1,260 @@
+import os
+
+from meilisearch import Client
+
+from server import database
+from server.indexer import iter_documents
+from server.metrics import InstrumentedBackend
+from server.profiling import current_profile
+
+# Backend de busca usado pelas rotas: "meilisearch" (padrão) ou "postgres"
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "meilisearch")
+
+# Configura o cliente Meilisearch
+MEILISEARCH_URL = os.getenv("MEILISEARCH_URL", "http://localhost:7700")
+MEILISEARCH_API_KEY = os.getenv("MEILISEARCH_API_KEY", "masterKey")
+client = Client(MEILISEARCH_URL, MEILISEARCH_API_KEY)
+INDEX_NAME = "convenios"
+
+# Visões dos resultados de busca: "list" traz só o necessário para a listagem,
+# com um trecho do texto; "full" traz o documento inteiro com os destaques
+VIEWS = ("list", "full")
+RESULT_FIELDS = database.RESULT_COLUMNS
+LIST_FIELDS = database.LIST_COLUMNS
+
+
+class SearchBackend:
+    """Interface de busca usada pelas rotas.
+
+    search() retorna {"hits": [...], "total": int, "suggestions": [...],
+    "next_position": dict | None}, em que cada hit é o convênio com
+    title_highlight e discounts_highlight, mais content_highlight na visão
+    "full" ou snippet (trecho do texto em volta dos termos) na visão "list";
+    `fields` restringe os atributos de cada hit a um subconjunto de
+    RESULT_FIELDS, e os destaques seguem os atributos pedidos. suggestions é
+    uma lista de {"id", "title"} com até `suggestions` itens. `after` e
+    next_position são posições de paginação por cursor (ver server.pagination);
+    com `after`, total pode ser None quando contar custaria caro.
+    """
+
+    name = None
+
+    def search(
+        self, search_text, page, page_size, sort_by, order, category, suggestions=0, after=None,
+        fields=None, view="full",
+    ):
+        raise NotImplementedError
+
+    def suggest(self, search_text, limit):
+        """Lista de {"id", "title"} para autocompletar."""
+        raise NotImplementedError
+
+    def categories(self):
+        """Lista de {"name", "count"} ordenada pelo nome."""
+        raise NotImplementedError
+
+    def get_convenio(self, id):
+        """O convênio com o ID informado, ou None."""
+        raise NotImplementedError
+
+    def export(self, since=None):
+        """Itera sobre todos os convênios (ou os alterados depois de `since`, em epoch) sem carregá-los de uma vez."""
+        raise NotImplementedError
+
+    def titles(self):
+        """Itera sobre {"id", "title"} de todos os convênios, para o índice de autocompletar."""
+        raise NotImplementedError
+
+
+class MeilisearchBackend(SearchBackend):
+    name = "meilisearch"
+
+    def __init__(self, client, index_name):
+        self.client = client
+        self.index_name = index_name
+
+    def suggestion_query(self, search_text, limit):
+        """Consulta leve de sugestões: só título, sem destaque nem ordenação."""
+        return {
+            "indexUid": self.index_name,
+            "q": search_text,
+            "limit": limit,
+            "attributesToRetrieve": ["id", "title"],
+            "attributesToSearchOn": ["title"],
+        }
+
+    def search(
+        self, search_text, page, page_size, sort_by, order, category, suggestions=0, after=None,
+        fields=None, view="full",
+    ):
+        # O Meilisearch não tem busca por chave: o cursor guarda o offset
+        offset = after["offset"] if after else (page - 1) * page_size
+
+        # Configuração do filtro e ordenação
+        filters = []
+        if category:
+            # Igualdade exata contra um dos itens do array categories
+            escaped = category.replace("\\", "\\\\").replace('"', '\\"')
+            filters.append(f'categories = "{escaped}"')
+
+        sort = [f"{sort_by}:{order}"] if sort_by else None
+
+        # Projeção: só os atributos pedidos saem do Meilisearch e são destacados
+        requested = set(fields or (LIST_FIELDS if view == "list" else RESULT_FIELDS)) | {"id"}
+        highlighted = [f for f in ("title", "discounts") + (("content",) if view == "full" else ()) if f in requested]
+        retrieve = [f for f in RESULT_FIELDS if f in requested]
+        query = {
+            "indexUid": self.index_name,
+            "q": search_text,
+            "limit": page_size,
+            "offset": offset,
+            "filter": " AND ".join(filters) if filters else None,
+            "sort": sort,
+            "attributesToRetrieve": retrieve if fields or view == "list" else ["*"],
+            "attributesToHighlight": highlighted,
+            "highlightPreTag": "<em>",  # Tag usada para abrir o destaque
+            "highlightPostTag": "</em>",  # Tag usada para fechar o destaque
+        }
+        if view == "list":
+            # Trecho do texto em volta dos termos, em vez do content inteiro;
+            # o text vem junto só para o recorte e sai do hit abaixo
+            query["attributesToRetrieve"] = retrieve + ["text"]
+            query["attributesToHighlight"] = highlighted + ["text"]
+            query["attributesToCrop"] = ["text"]
+            query["cropLength"] = database.SNIPPET_WORDS
+
+        # Busca principal e sugestões em uma única ida ao Meilisearch
+        queries = [query]
+        if search_text and suggestions:
+            queries.append(self.suggestion_query(search_text, suggestions))
+        profile = current_profile()
+        if profile:
+            profile.lap("search_prepare")
+        results = self.client.multi_search(queries)["results"]
+        if profile:
+            profile.lap("meilisearch")
+        search_result = results[0]
+        total = search_result.get("estimatedTotalHits", 0)
+        next_offset = offset + page_size
+
+        hits = [
+            self.format_hit(item, requested if fields or view == "list" else None, highlighted, view)
+            for item in search_result.get("hits", [])
+        ]
+        if profile:
+            profile.lap("format_hits")
+        return {
+            "hits": hits,
+            "total": total,
+            "suggestions": [
+                {"id": item["id"], "title": item["title"]}
+                for item in (results[1].get("hits", []) if len(results) > 1 else [])
+            ],
+            "next_position": {"offset": next_offset} if next_offset < total else None,
+        }
+
+    @staticmethod
+    def format_hit(item, keep, highlighted, view):
+        """Hit sem _formatted, só com os atributos em `keep` (todos se None) e os destaques."""
+        formatted = item.pop("_formatted", {})
+        hit = {key: value for key, value in item.items() if keep is None or key in keep}
+        for field in highlighted:
+            hit[f"{field}_highlight"] = formatted.get(field, item.get(field))
+        if view == "list":
+            hit["snippet"] = formatted.get("text", "")
+        return hit
+
+    def suggest(self, search_text, limit):
+        result = self.client.multi_search([self.suggestion_query(search_text, limit)])["results"][0]
+        return [{"id": item["id"], "title": item["title"]} for item in result.get("hits", [])]
+
+    def categories(self):
+        # Categorias e contagens vêm da distribuição de facetas, sem trazer documentos
+        search_result = self.client.index(self.index_name).search("", {"facets": ["categories"], "limit": 0})
+        distribution = search_result.get("facetDistribution", {}).get("categories", {})
+        return [{"name": name, "count": count} for name, count in sorted(distribution.items())]
+
+    def get_convenio(self, id):
+        convenio = self.client.index(self.index_name).get_document(id)
+        # Converte o objeto para um dicionário se necessário
+        return dict(convenio) if not isinstance(convenio, dict) else convenio
+
+    def export(self, since=None):
+        filter = f"updated_at > {int(since)}" if since is not None else None
+        return iter_documents(self.client.index(self.index_name), filter=filter)
+
+    def titles(self):
+        return iter_documents(self.client.index(self.index_name), fields=["id", "title"])
+
+
+class PostgresBackend(SearchBackend):
+    """Busca no Postgres, pelo tsvector armazenado e pelos índices de trigramas."""
+
+    name = "postgres"
+
+    def search(
+        self, search_text, page, page_size, sort_by, order, category, suggestions=0, after=None,
+        fields=None, view="full",
+    ):
+        profile = current_profile()
+        if profile:
+            profile.lap("search_prepare")
+        hits = database.search_convenios(search_text, page, page_size, sort_by, order, category, after, fields, view)
+        if profile:
+            profile.lap("postgres_search")
+        # A posição do último item é o ponto de partida da próxima página
+        next_position = None
+        if len(hits) == page_size:
+            next_position = {"value": hits[-1]["sort_value"], "id": hits[-1]["id"]}
+        for hit in hits:
+            hit.pop("sort_value", None)
+        # Páginas por cursor não recontam: o total já veio na primeira página
+        total = None if after else database.count_convenios(search_text, category)
+        if profile:
+            profile.lap("postgres_count")
+        suggested = database.suggest_titles(search_text, suggestions) if search_text and suggestions else []
+        if profile:
+            profile.lap("postgres_suggest")
+        return {
+            "hits": hits,
+            "total": total,
+            "suggestions": suggested,
+            "next_position": next_position,
+        }
+
+    def suggest(self, search_text, limit):
+        return database.suggest_titles(search_text, limit)
+
+    def categories(self):
+        return database.count_cats()
+
+    def get_convenio(self, id):
+        return database.find_convenio_by_id(id)
+
+    def export(self, since=None):
+        return database.iter_convenios(since)
+
+    def titles(self):
+        return database.iter_titles()
+
+
+_backend = None
+
+
+def set_backend(backend):
+    """Troca o backend usado pelas rotas (ex.: um substituto em memória nos benchmarks)."""
+    global _backend
+    _backend = InstrumentedBackend(backend)
+
+
+def get_backend():
+    """Retorna o backend configurado em SEARCH_BACKEND."""
+    global _backend
+    if _backend is None:
+        if SEARCH_BACKEND == "postgres":
+            set_backend(PostgresBackend())
+        elif SEARCH_BACKEND == "meilisearch":
+            set_backend(MeilisearchBackend(client, INDEX_NAME))
+        else:
+            raise ValueError(f"SEARCH_BACKEND desconhecido: {SEARCH_BACKEND}")
+    return _backend
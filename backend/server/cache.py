@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from server.generation import current_generation
+from server.metrics import CACHE_LOOKUPS
+
+
+class ResponseCache:
+    """Cache LRU em memória com TTL, limitado por quantidade de entradas e por bytes.
+
+    Cada entrada guarda a geração do índice em que foi criada; quando a
+    geração muda (fim de uma coleta ou reindexação), as entradas antigas
+    deixam de ser servidas e são descartadas ao serem encontradas.
+    """
+
+    def __init__(self, name, max_entries=1024, max_bytes=32 * 1024 * 1024, ttl=60):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        generation = current_generation()
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self._miss()
+                return None
+            entry_generation, expires_at, value, size = entry
+            if entry_generation != generation or expires_at <= now:
+                self._remove(key)
+                self._miss()
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.labels(cache=self.name, result="hit").inc()
+            return value
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        entry = (current_generation(), time.monotonic() + self.ttl, value, size)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = entry
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "generation": current_generation(),
+            }
+
+    def _miss(self):
+        self.misses += 1
+        CACHE_LOOKUPS.labels(cache=self.name, result="miss").inc()
+
+    def _remove(self, key):
+        _, _, _, size = self.entries.pop(key)
+        self.size -= size
+
+
+def normalize_text(value):
+    """Normaliza um termo de busca para uso em chaves de cache."""
+    return " ".join(value.lower().split())
+
+
+# Cache das respostas de GET /convenios
+convenios_cache = ResponseCache(
+    "convenios",
+    max_entries=int(os.getenv("CONVENIOS_CACHE_MAX_ENTRIES", 1024)),
+    max_bytes=int(os.getenv("CONVENIOS_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    ttl=float(os.getenv("CONVENIOS_CACHE_TTL", 60)),
+)
+
+# Cache das sugestões de GET /suggest: respostas pequenas e muito repetidas
+suggest_cache = ResponseCache(
+    "suggest",
+    max_entries=int(os.getenv("SUGGEST_CACHE_MAX_ENTRIES", 4096)),
+    max_bytes=int(os.getenv("SUGGEST_CACHE_MAX_BYTES", 4 * 1024 * 1024)),
+    ttl=float(os.getenv("SUGGEST_CACHE_TTL", 300)),
+)
+
+# Lista de categorias com contagens: muda só quando muda a geração do índice
+categories_cache = ResponseCache(
+    "categories", max_entries=1, max_bytes=1024 * 1024, ttl=float(os.getenv("CATEGORIES_CACHE_TTL", 3600))
+)
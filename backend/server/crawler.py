@@ -0,0 +1,303 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+# Diretório do projeto Scrapy (o que contém scrapy.cfg)
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "myspider_project")
+SPIDER_NAME = "convenio_spider"
+# Intervalo entre os envios de estatísticas do worker para o servidor, em segundos
+STATS_INTERVAL = float(os.getenv("CRAWL_STATS_INTERVAL", 1.0))
+# Tempo máximo de uma coleta; ao estourar, o spider é fechado com o motivo "timeout"
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", 3600))
+# Folga além de CRAWL_TIMEOUT antes de o servidor desistir de esperar o worker
+CRAWL_WAIT_SLACK = float(os.getenv("CRAWL_WAIT_SLACK", 300))
+# De quanto em quanto tempo wait() confere um pedido de cancelamento, em segundos
+CANCEL_POLL_INTERVAL = 1.0
+
+
+def summarize_stats(stats, elapsed):
+    """Resumo das estatísticas do Scrapy enviado ao servidor."""
+    indexed = stats.get("meilisearch/documents_sent", 0) + stats.get("postgres/inserted", 0) + stats.get("postgres/updated", 0)
+    return {
+        "requests": stats.get("downloader/request_count", 0),
+        "responses": stats.get("downloader/response_count", 0),
+        "pages_crawled": stats.get("response_received_count", 0),
+        "detail_pages": stats.get("convenios/detail_pages", 0),
+        "items_scraped": stats.get("item_scraped_count", 0),
+        "items_dropped": stats.get("item_dropped_count", 0),
+        "items_indexed": indexed,
+        "items_unchanged": stats.get("meilisearch/unchanged", 0) + stats.get("postgres/unchanged", 0),
+        "items_removed": stats.get("meilisearch/removed", 0) + stats.get("postgres/removed", 0),
+        "errors": stats.get("log_count/ERROR", 0) + stats.get("spider_exceptions/count", 0),
+        "bytes": stats.get("downloader/response_bytes", 0),
+        "elapsed_seconds": round(elapsed, 3),
+    }
+
+
+class _CrawlService:
+    """Lado do worker: executa os jobs, um de cada vez, no reactor do processo."""
+
+    def __init__(self, runner, events):
+        self.runner = runner
+        self.events = events
+        self.pending = []
+        self.current = None  # (job, crawler, started_at, timeout_call)
+
+    def submit(self, job):
+        self.pending.append(job)
+        self._start_next()
+
+    def cancel(self, job_id):
+        for job in self.pending:
+            if job["id"] == job_id:
+                self.pending.remove(job)
+                self.events.put({"type": "finished", "job_id": job_id, "reason": "cancelled", "stats": None})
+                return
+        if self.current and self.current[0]["id"] == job_id:
+            self._close(self.current[1], "cancelled")
+
+    def _start_next(self):
+        from scrapy.crawler import Crawler
+        from scrapy.utils.project import get_project_settings
+        from twisted.internet import reactor
+
+        if self.current or not self.pending:
+            return
+        job = self.pending.pop(0)
+        started_at = time.monotonic()
+        try:
+            settings = get_project_settings()
+            settings.setdict(job.get("settings") or {}, priority="cmdline")
+            crawler = Crawler(self.runner.spider_loader.load(SPIDER_NAME), settings)
+
+            timeout = job.get("timeout") or CRAWL_TIMEOUT
+            timeout_call = reactor.callLater(timeout, self._close, crawler, "timeout")
+            self.current = (job, crawler, started_at, timeout_call)
+            self.events.put({"type": "started", "job_id": job["id"]})
+
+            d = self.runner.crawl(crawler, **(job.get("spider_args") or {}))
+        except Exception as e:
+            # Sem o evento "finished", quem espera o job ficaria esperando para sempre
+            if self.current and self.current[0] is job:
+                self.current[3].cancel()
+            self.current = None
+            logging.exception(f"[Crawler] Erro ao iniciar o job {job['id']}")
+            self.events.put({
+                "type": "finished",
+                "job_id": job["id"],
+                "reason": "error",
+                "error": f"Erro ao iniciar a coleta: {e}",
+                "stats": summarize_stats({}, time.monotonic() - started_at),
+            })
+            self._start_next()
+            return
+        d.addBoth(self._finished, job, crawler)
+
+    def _close(self, crawler, reason):
+        if crawler.engine is not None and crawler.spider is not None:
+            crawler.engine.close_spider(crawler.spider, reason)
+        else:
+            crawler.stop()
+
+    def _finished(self, result, job, crawler):
+        _, _, started_at, timeout_call = self.current
+        if timeout_call.active():
+            timeout_call.cancel()
+        self.current = None
+
+        stats = crawler.stats.get_stats()
+        error = None
+        if hasattr(result, "getErrorMessage"):
+            error = result.getErrorMessage()
+        self.events.put({
+            "type": "finished",
+            "job_id": job["id"],
+            "reason": "error" if error else stats.get("finish_reason", "finished"),
+            "error": error,
+            "stats": summarize_stats(stats, time.monotonic() - started_at),
+        })
+        self._start_next()
+
+    def report(self):
+        if self.current:
+            job, crawler, started_at, _ = self.current
+            self.events.put({
+                "type": "stats",
+                "job_id": job["id"],
+                "stats": summarize_stats(crawler.stats.get_stats(), time.monotonic() - started_at),
+            })
+
+
+def _worker_main(commands, events):
+    """Ponto de entrada do processo de coleta.
+
+    Importa o Scrapy uma única vez e mantém o reactor rodando; os comandos
+    chegam pela fila `commands` e são repassados ao reactor por uma thread.
+    """
+    sys.path.insert(0, PROJECT_DIR)
+    os.chdir(PROJECT_DIR)
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "myspider_project.settings")
+
+    from scrapy.utils.project import get_project_settings
+    from scrapy.utils.reactor import install_reactor
+
+    settings = get_project_settings()
+    # O reactor pedido em TWISTED_REACTOR precisa ser instalado antes de
+    # qualquer import de twisted.internet.reactor, senão o Twisted instala o
+    # padrão e todo Crawler falha na verificação do reactor
+    install_reactor(settings["TWISTED_REACTOR"])
+
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.utils.log import configure_logging
+    from twisted.internet import reactor, task
+
+    configure_logging(settings)
+    service = _CrawlService(CrawlerRunner(settings), events)
+    task.LoopingCall(service.report).start(STATS_INTERVAL, now=False)
+
+    def read_commands():
+        while True:
+            command = commands.get()
+            if command is None:
+                reactor.callFromThread(reactor.stop)
+                return
+            if command["type"] == "submit":
+                reactor.callFromThread(service.submit, command["job"])
+            elif command["type"] == "cancel":
+                reactor.callFromThread(service.cancel, command["job_id"])
+
+    threading.Thread(target=read_commands, daemon=True).start()
+    events.put({"type": "ready", "pid": os.getpid()})
+    reactor.run(installSignalHandlers=False)
+
+
+class CrawlWorker:
+    """Processo dedicado às coletas, com o Scrapy já importado e o reactor rodando.
+
+    submit() só coloca o job na fila do processo e retorna o ID; as
+    estatísticas e o resultado chegam como eventos e são repassados aos
+    callbacks registrados com on_event(). Os jobs rodam um de cada vez.
+    """
+
+    def __init__(self):
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.commands = None
+        self.events = None
+        self.listener = None
+        self.lock = threading.Lock()
+        self.job_ids = itertools.count(1)
+        self.jobs = {}
+        self.callbacks = []
+
+    def start(self):
+        """Inicia o processo, se ainda não estiver rodando."""
+        with self.lock:
+            if self.process is not None and self.process.is_alive():
+                return
+            self.commands = self.context.Queue()
+            self.events = self.context.Queue()
+            self.process = self.context.Process(
+                target=_worker_main, args=(self.commands, self.events), name="crawl-worker", daemon=True
+            )
+            self.process.start()
+            self.listener = threading.Thread(target=self._listen, args=(self.process, self.events), daemon=True)
+            self.listener.start()
+            logging.info(f"[Crawler] Worker de coleta iniciado (pid {self.process.pid})")
+
+    def stop(self):
+        with self.lock:
+            if self.process is None:
+                return
+            self.commands.put(None)
+            self.process.join(timeout=10)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+    def on_event(self, callback):
+        """Registra callback(event) chamado para cada evento do worker."""
+        self.callbacks.append(callback)
+
+    def submit(self, settings=None, timeout=None, spider_args=None):
+        """Enfileira uma coleta com as configurações do Scrapy informadas; retorna o ID do job.
+
+        `spider_args` são os argumentos do spider (ex.: start_url).
+        """
+        self.start()
+        job_id = next(self.job_ids)
+        self.jobs[job_id] = {"state": "queued", "done": threading.Event(), "result": None, "stats": None}
+        self.commands.put({"type": "submit", "job": {
+            "id": job_id, "settings": settings or {}, "timeout": timeout, "spider_args": spider_args or {},
+        }})
+        return job_id
+
+    def cancel(self, job_id):
+        if job_id in self.jobs and self.process is not None:
+            self.commands.put({"type": "cancel", "job_id": job_id})
+
+    def wait(self, job_id, timeout=None, cancel_if=None):
+        """Espera o fim do job e retorna o evento "finished" (reason, error, stats).
+
+        `cancel_if()` é conferida a cada CANCEL_POLL_INTERVAL; quando retorna
+        True, o job é cancelado e a espera continua até o evento "finished".
+        """
+        job = self.jobs[job_id]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        cancelled = False
+        while True:
+            step = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if cancel_if is not None and not cancelled:
+                step = CANCEL_POLL_INTERVAL if step is None else min(step, CANCEL_POLL_INTERVAL)
+            if job["done"].wait(step):
+                return self.jobs.pop(job_id)["result"]
+            if deadline is not None and time.monotonic() >= deadline:
+                self.jobs.pop(job_id, None)
+                raise TimeoutError(f"Job de coleta {job_id} não terminou em {timeout}s")
+            if cancel_if is not None and not cancelled and cancel_if():
+                cancelled = True
+                self.cancel(job_id)
+
+    def _listen(self, process, events):
+        while True:
+            try:
+                event = events.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    self._fail_all(f"Worker de coleta terminou (código {process.exitcode})")
+                    return
+                continue
+            self._dispatch(event)
+
+    def _dispatch(self, event):
+        job = self.jobs.get(event.get("job_id"))
+        if job is not None:
+            if event["type"] == "started":
+                job["state"] = "running"
+            elif event["type"] == "stats":
+                job["stats"] = event["stats"]
+            elif event["type"] == "finished":
+                job["state"] = "finished"
+                job["result"] = event
+                job["stats"] = event["stats"] or job["stats"]
+        for callback in self.callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"[Crawler] Erro ao tratar evento {event['type']}: {e}")
+        if job is not None and event["type"] == "finished":
+            job["done"].set()
+
+    def _fail_all(self, message):
+        logging.error(f"[Crawler] {message}")
+        for job_id, job in list(self.jobs.items()):
+            if not job["done"].is_set():
+                self._dispatch({"type": "finished", "job_id": job_id, "reason": "error", "error": message, "stats": job["stats"]})
+
+
+crawl_worker = CrawlWorker()
@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Text, func, DDL
+from sqlalchemy import create_engine, MetaData, Table, Column, DateTime, ForeignKey, Integer, String, Text, func, DDL
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
-from sqlalchemy.sql import text, select
+from sqlalchemy.sql import text, select, literal_column
 from sqlalchemy.event import listen
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert as pg_insert
 from server.logging import logging
+from server.metrics import POSTGRES_UPSERT_DURATION
+from datetime import datetime, timezone
 import time
 import os
 
@@ -23,8 +26,48 @@ convenios_table = Table(
     Column("cats", String, nullable=True),
     Column("content", Text, nullable=True),
     Column("discounts", String, nullable=True),
-    Column("search_vector", Text, nullable=True),  # Coluna para Full-Text Search
+    Column("text", Text, nullable=True),  # Conteúdo sem HTML, usado na busca
+    Column("url", String, nullable=True),
+    Column("image", String, nullable=True),
+    Column("content_hash", String, nullable=True),  # Hash do conteúdo calculado pelo spider
+    Column("search_vector", TSVECTOR, nullable=True),  # Coluna para Full-Text Search
+    # Última gravação com conteúdo diferente; base da exportação incremental
+    Column("updated_at", DateTime(timezone=True), nullable=True, server_default=func.now()),
 )
+
+# Categorias normalizadas; convenio_count é mantido por trigger em convenio_categories
+categories_table = Table(
+    "categories",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False, unique=True),
+    Column("convenio_count", Integer, nullable=False, server_default="0"),
+)
+
+# Relação N:N entre convênios e categorias
+convenio_categories_table = Table(
+    "convenio_categories",
+    metadata,
+    Column("convenio_id", String, ForeignKey("convenios.id", ondelete="CASCADE"), primary_key=True),
+    Column("category_id", Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True),
+)
+
+# Colunas aceitas em ORDER BY (o valor vem da query string)
+SORTABLE_COLUMNS = {"title", "date", "cats"}
+# Abaixo disso o índice de trigramas não ajuda, e a busca fica só no tsvector
+MIN_SUBSTRING_LENGTH = 3
+# Colunas gravadas pela carga em lote, na ordem dos itens do spider
+UPSERT_COLUMNS = ("id", "title", "date", "cats", "content", "discounts", "text", "url", "image", "content_hash")
+# Colunas que podem ser pedidas nos resultados da busca (parâmetro fields=)
+RESULT_COLUMNS = UPSERT_COLUMNS
+# Colunas padrão de cada visão: a listagem dispensa o HTML completo
+LIST_COLUMNS = ("id", "title", "date", "cats", "discounts", "url", "image")
+FULL_COLUMNS = ("id", "title", "date", "cats", "content", "discounts", "url", "image")
+# Tamanho do trecho de texto em volta dos termos buscados, na visão de listagem
+SNIPPET_WORDS = 30
+SNIPPET_CHARS = 200
+
+
 def create_tables():
     """Recria as tabelas no banco de dados, índices e triggers para Full-Text Search."""
     try:
@@ -32,27 +75,75 @@ def create_tables():
         metadata.create_all(engine)
         print("Tabelas recriadas com sucesso!")
 
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             # Habilitar extensões
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent;"))
             print("Extensões habilitadas com sucesso!")
 
-            # Adiciona a coluna search_vector, se não existir
+            # Colunas adicionadas depois da primeira versão da tabela
+            for column, column_type in (
+                ("text", "TEXT"),
+                ("url", "VARCHAR"),
+                ("image", "VARCHAR"),
+                ("content_hash", "VARCHAR"),
+                ("search_vector", "tsvector"),
+                ("updated_at", "TIMESTAMPTZ DEFAULT now()"),
+            ):
+                conn.execute(text(f"ALTER TABLE convenios ADD COLUMN IF NOT EXISTS {column} {column_type};"))
+
+            # Versões anteriores criavam search_vector como TEXT, o que impedia o índice GIN
             conn.execute(text("""
-                ALTER TABLE convenios
-                ADD COLUMN IF NOT EXISTS search_vector tsvector;
+                DO $$
+                BEGIN
+                    IF EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'convenios' AND column_name = 'search_vector' AND data_type <> 'tsvector'
+                    ) THEN
+                        ALTER TABLE convenios ALTER COLUMN search_vector TYPE tsvector USING NULL;
+                    END IF;
+                END $$;
             """))
             print("Coluna 'search_vector' adicionada com sucesso!")
 
-            # Criação do índice GIN
+            # O índice GIN precisa ser sobre a própria coluna usada no WHERE; o
+            # antigo era sobre outra expressão e nunca era usado
+            conn.execute(text("DROP INDEX IF EXISTS idx_convenios_search;"))
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_convenios_search
+                CREATE INDEX IF NOT EXISTS idx_convenios_search_vector
                 ON convenios
-                USING GIN (to_tsvector('portuguese', unaccent(title || ' ' || content || ' ' || COALESCE(discounts, ''))));
+                USING GIN (search_vector);
             """))
             print("Índice GIN criado com sucesso!")
 
+            # Índices de trigramas para as buscas por substring (ILIKE '%x%');
+            # o filtro por categoria agora usa convenio_categories
+            conn.execute(text("DROP INDEX IF EXISTS idx_convenios_cats_trgm;"))
+            for column in ("title", "text", "discounts"):
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS idx_convenios_{column}_trgm
+                    ON convenios
+                    USING GIN ({column} gin_trgm_ops);
+                """))
+            print("Índices de trigramas criados com sucesso!")
+
+            # Índices da paginação por chave: (chave de ordenação, id)
+            for column in SORTABLE_COLUMNS:
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS idx_convenios_{column}_seek
+                    ON convenios ({sort_expression(column)}, id);
+                """))
+            print("Índices de ordenação criados com sucesso!")
+
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_convenios_updated_at ON convenios (updated_at);"))
+
+            # Filtro por categoria: category_id -> convenio_id direto no índice
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_convenio_categories_category
+                ON convenio_categories (category_id, convenio_id);
+            """))
+            print("Índice de categorias criado com sucesso!")
+
         # Para comandos de criação de função e trigger, use uma conexão em modo autocommit
         with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
             # Criação da função para atualizar o search_vector
@@ -62,7 +153,7 @@ def create_tables():
                 BEGIN
                     NEW.search_vector := to_tsvector('portuguese', unaccent(
                         COALESCE(NEW.title, '') || ' ' || 
-                        COALESCE(NEW.content, '') || ' ' || 
+                        COALESCE(NEW.text, NEW.content, '') || ' ' || 
                         COALESCE(NEW.discounts, '')));
                     RETURN NEW;
                 END;
@@ -71,6 +162,7 @@ def create_tables():
             print("Função 'update_search_vector' criada com sucesso!")
 
             # Criação do trigger
+            conn.execute(text("DROP TRIGGER IF EXISTS trigger_update_search_vector ON convenios;"))
             conn.execute(text("""
                 CREATE TRIGGER trigger_update_search_vector
                 BEFORE INSERT OR UPDATE ON convenios
@@ -79,121 +171,374 @@ def create_tables():
             """))
             print("Trigger para atualizar o 'search_vector' criado com sucesso!")
 
-        # Atualização dos registros existentes
-        with engine.connect() as conn:
+            # Contagem de convênios por categoria, mantida a cada vínculo criado ou removido
+            conn.execute(text("""
+                CREATE OR REPLACE FUNCTION update_category_count()
+                RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN
+                        UPDATE categories SET convenio_count = convenio_count + 1 WHERE id = NEW.category_id;
+                    ELSE
+                        UPDATE categories SET convenio_count = convenio_count - 1 WHERE id = OLD.category_id;
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """))
+            conn.execute(text("DROP TRIGGER IF EXISTS trigger_update_category_count ON convenio_categories;"))
+            conn.execute(text("""
+                CREATE TRIGGER trigger_update_category_count
+                AFTER INSERT OR DELETE ON convenio_categories
+                FOR EACH ROW
+                EXECUTE FUNCTION update_category_count();
+            """))
+            print("Trigger para atualizar a contagem de categorias criado com sucesso!")
+
+        # Atualização dos registros que ainda não têm search_vector
+        with engine.begin() as conn:
             conn.execute(text("""
                 UPDATE convenios
                 SET search_vector = to_tsvector('portuguese', unaccent(
                     COALESCE(title, '') || ' ' || 
-                    COALESCE(content, '') || ' ' || 
-                    COALESCE(discounts, '')));
+                    COALESCE(text, content, '') || ' ' || 
+                    COALESCE(discounts, '')))
+                WHERE search_vector IS NULL;
             """))
             print("Registros existentes atualizados com sucesso!")
 
+            # Convênios gravados antes da tabela de categorias: vínculos a partir de cats
+            conn.execute(text("""
+                INSERT INTO categories (name)
+                SELECT DISTINCT trim(cat)
+                FROM convenios, unnest(string_to_array(cats, ',')) AS cat
+                WHERE trim(cat) <> ''
+                ON CONFLICT (name) DO NOTHING;
+            """))
+            conn.execute(text("""
+                INSERT INTO convenio_categories (convenio_id, category_id)
+                SELECT DISTINCT convenios.id, categories.id
+                FROM convenios, unnest(string_to_array(cats, ',')) AS cat, categories
+                WHERE categories.name = trim(cat)
+                  AND NOT EXISTS (SELECT 1 FROM convenio_categories cc WHERE cc.convenio_id = convenios.id)
+                ON CONFLICT DO NOTHING;
+            """))
+            # Corrige contagens que tenham divergido (ex.: TRUNCATE não dispara triggers)
+            conn.execute(text("""
+                UPDATE categories
+                SET convenio_count = counted.count
+                FROM (
+                    SELECT categories.id, count(cc.convenio_id) AS count
+                    FROM categories LEFT JOIN convenio_categories cc ON cc.category_id = categories.id
+                    GROUP BY categories.id
+                ) AS counted
+                WHERE categories.id = counted.id AND categories.convenio_count <> counted.count;
+            """))
+            print("Categorias normalizadas com sucesso!")
+
     except SQLAlchemyError as e:
         print(f"Erro ao recriar tabelas ou configurar Full-Text Search: {e}")
         
         
-def search_convenios(search_text=None, page=1, page_size=10, sort_by="title", order="asc", cat=None):
-    """Busca convênios no banco de dados com paginação, ordenação e destaque."""
+def build_search_filters(search_text=None, cat=None):
+    """Monta o WHERE compartilhado pela busca e pela contagem.
+
+    Cada ramo do OR tem índice próprio (GIN do tsvector e GIN de trigramas),
+    então o Postgres combina os índices com um BitmapOr em vez de varrer a tabela.
+    """
+    filters = []
+    params = {}
+
+    if search_text and search_text.strip():
+        search_text = search_text.strip()
+        branches = ["search_vector @@ websearch_to_tsquery('portuguese', unaccent(:search_text))"]
+        params["search_text"] = search_text
+        if len(search_text) >= MIN_SUBSTRING_LENGTH:
+            branches += ["title ILIKE :ilike_text", "text ILIKE :ilike_text", "discounts ILIKE :ilike_text"]
+            params["ilike_text"] = f"%{search_text}%"
+        filters.append("(" + " OR ".join(branches) + ")")
+
+    if cat:
+        # Categoria exata, pelo índice de convenio_categories
+        filters.append("""id IN (
+            SELECT cc.convenio_id FROM convenio_categories cc
+            JOIN categories ON categories.id = cc.category_id
+            WHERE categories.name = :cat
+        )""")
+        params["cat"] = cat
+
+    where = (" WHERE " + " AND ".join(filters)) if filters else ""
+    return where, params
+
+
+def build_search_query(
+    search_text=None, page=1, page_size=10, sort_by="title", order="asc", cat=None, after=None,
+    fields=None, view="full",
+):
+    """Monta a consulta paginada de busca; retorna (sql, params).
+
+    `fields` restringe as colunas retornadas (padrão: LIST_COLUMNS ou
+    FULL_COLUMNS, conforme `view`). Os destaques só são calculados para as
+    colunas pedidas; na visão "list", em vez do content destacado, vem um
+    snippet com o trecho do texto em volta dos termos buscados.
+
+    Sem `after`, pagina por OFFSET. Com `after` ({"value", "id"} do último
+    item da página anterior), pagina por chave: a comparação de tupla com
+    (chave de ordenação, id) usa o índice btree correspondente, e o custo de
+    cada página não cresce com a profundidade.
+    """
+    has_search = bool(search_text and search_text.strip())
+    requested = set(fields or (LIST_COLUMNS if view == "list" else FULL_COLUMNS)) | {"id"}
+    columns = [column for column in RESULT_COLUMNS if column in requested]
+
+    tsquery = "websearch_to_tsquery('portuguese', unaccent(:search_text))"
+    highlighted = ["title", "discounts"] + (["content"] if view == "full" else [])
+    highlights = [
+        (f"ts_headline('portuguese', {column}, {tsquery})" if has_search else column) + f" AS {column}_highlight"
+        for column in highlighted
+        if column in requested
+    ]
+    if view == "list":
+        if has_search:
+            options = f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=1"
+            highlights.append(f"ts_headline('portuguese', COALESCE(text, ''), {tsquery}, '{options}') AS snippet")
+        else:
+            highlights.append(f"left(COALESCE(text, ''), {SNIPPET_CHARS}) AS snippet")
+
+    where, params = build_search_filters(search_text, cat)
+    sort_key = sort_expression(sort_by)
+    direction = "DESC" if order == "desc" else "ASC"
+    params["limit"] = page_size
+
+    if after is None:
+        params["offset"] = (page - 1) * page_size
+        pagination = "LIMIT :limit OFFSET :offset"
+    else:
+        seek = f"({sort_key}, id) {'<' if direction == 'DESC' else '>'} (:after_value, :after_id)"
+        where = f"{where} AND {seek}" if where else f" WHERE {seek}"
+        params.update({"after_value": after["value"], "after_id": after["id"]})
+        pagination = "LIMIT :limit"
+
+    query = f"""
+        SELECT {", ".join(columns + [f"{sort_key} AS sort_value"] + highlights)}
+        FROM convenios
+        {where}
+        ORDER BY {sort_key} {direction}, id {direction}
+        {pagination}
+    """
+    return query, params
+
+
+def sort_expression(sort_by):
+    """Expressão de ordenação; é a mesma dos índices idx_convenios_<coluna>_seek."""
+    column = sort_by if sort_by in SORTABLE_COLUMNS else "title"
+    return f"COALESCE({column}, '')"
+
+
+def search_convenios(
+    search_text=None, page=1, page_size=10, sort_by="title", order="asc", cat=None, after=None,
+    fields=None, view="full",
+):
+    """Busca convênios no banco de dados com paginação, ordenação e destaque.
+
+    Cada linha traz também sort_value, a chave de ordenação usada para montar
+    o cursor da próxima página.
+    """
     try:
         with engine.connect() as conn:
-            # Base da consulta
-            base_query = """
-                SELECT 
-                    id, 
-                    title, 
-                    content, 
-                    cats,
-                    discounts
-            """
-
-            # Adiciona os campos destacados apenas se search_text for válido
-            if search_text and search_text.strip():
-                base_query += """,
-                    ts_headline('portuguese', title, websearch_to_tsquery(:search_text)) AS title_highlight,
-                    ts_headline('portuguese', content, websearch_to_tsquery(:search_text)) AS content_highlight,
-                    ts_headline('portuguese', discounts, websearch_to_tsquery(:search_text)) AS discounts_highlight
-                """
-            else:
-                base_query += """
-                    , title AS title_highlight,
-                    content AS content_highlight,
-                    discounts AS discounts_highlight
-                """
-
-            base_query += " FROM convenios"
-
-            filters = []
-            params = {
-                "limit": page_size,
-                "offset": (page - 1) * page_size,
-            }
-
-            # Adiciona filtros somente se search_text for válido
-            if search_text and search_text.strip():
-                filters.append("""
-                    (search_vector @@ websearch_to_tsquery(:search_text) 
-                    OR title ILIKE :ilike_text 
-                    OR content ILIKE :ilike_text 
-                    OR discounts ILIKE :ilike_text)
-                """)
-                params["search_text"] = search_text
-                params["ilike_text"] = f"%{search_text}%"
-
-            if cat:
-                filters.append("cats ILIKE :cat")
-                params["cat"] = f"%{cat}%"
-
-            if filters:
-                base_query += " WHERE " + " AND ".join(filters)
-
-            base_query += f" ORDER BY {sort_by} {'DESC' if order == 'desc' else 'ASC'}"
-            base_query += " LIMIT :limit OFFSET :offset"
-
-            query = text(base_query)
-            result = conn.execute(query, params)
+            query, params = build_search_query(search_text, page, page_size, sort_by, order, cat, after, fields, view)
+            result = conn.execute(text(query), params)
 
             # Retorna o resultado
             return [dict(row._mapping) for row in result]
 
     except SQLAlchemyError as e:
         logging.info(f"Erro ao buscar convênios: {e}")
-        return []
+        raise
     
 def insert_convenio(title, date, cats, content, id, discounts):
     """Insere um convênio no banco de dados"""
-    logging.info(f"Inserindo convênio: title={title}, date={date}, cats={cats}")
+    logging.debug(f"Inserindo convênio: title={title}, date={date}, cats={cats}")
     try:
         with engine.begin() as conn:  # Usa transação para garantir atomicidade
             conn.execute(
                 convenios_table.insert().values(title=title, date=date, cats=cats, content=content, id=id, discounts=discounts)
             )
-        logging.info(f"Convênio '{title}' inserido com sucesso!")
+            replace_convenio_categories(conn, {id: split_cats(cats)})
+        logging.debug(f"Convênio '{title}' inserido com sucesso!")
     except SQLAlchemyError as e:
         logging.info(f"Erro ao inserir convênio: {e}")
 
+def upsert_convenios_batch(conn, rows):
+    """Grava um lote com um único INSERT ... ON CONFLICT DO UPDATE.
+
+    Linhas cujo content_hash não mudou não são atualizadas (nem disparam o
+    trigger do search_vector). Retorna (inseridas, atualizadas).
+    """
+    statement = pg_insert(convenios_table).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[convenios_table.c.id],
+        set_={
+            **{column: statement.excluded[column] for column in UPSERT_COLUMNS if column != "id"},
+            "updated_at": func.now(),
+        },
+        where=convenios_table.c.content_hash.is_distinct_from(statement.excluded.content_hash),
+    ).returning(convenios_table.c.id, literal_column("xmax = 0").label("inserted"))
+    written = conn.execute(statement).fetchall()
+    inserted = sum(1 for row in written if row.inserted)
+    return inserted, len(written) - inserted, [row.id for row in written]
+
+
+def split_cats(cats):
+    """Lista de categorias a partir da string separada por vírgulas."""
+    return [cat.strip() for cat in (cats or "").split(",") if cat.strip()]
+
+
+def replace_convenio_categories(conn, categories_by_id):
+    """Substitui os vínculos de categoria dos convênios informados.
+
+    `categories_by_id` é {id do convênio: [nomes das categorias]}. As
+    categorias novas são criadas, e os triggers de convenio_categories
+    ajustam convenio_count.
+    """
+    if not categories_by_id:
+        return
+    conn.execute(
+        convenio_categories_table.delete().where(
+            convenio_categories_table.c.convenio_id.in_(list(categories_by_id))
+        )
+    )
+    names = sorted({name for names in categories_by_id.values() for name in names})
+    if not names:
+        return
+    conn.execute(
+        pg_insert(categories_table).values([{"name": name} for name in names]).on_conflict_do_nothing(
+            index_elements=[categories_table.c.name]
+        )
+    )
+    ids = dict(conn.execute(
+        select(categories_table.c.name, categories_table.c.id).where(categories_table.c.name.in_(names))
+    ).fetchall())
+    links = [
+        {"convenio_id": convenio_id, "category_id": ids[name]}
+        for convenio_id, names in categories_by_id.items()
+        for name in set(names)
+    ]
+    if links:
+        conn.execute(convenio_categories_table.insert().values(links))
+
+
+def bulk_upsert_convenios(items, batch_size=500):
+    """Carrega convênios em lotes, a partir de qualquer iterável de itens do spider.
+
+    Cada lote é uma ida ao banco, dentro de uma única transação. Retorna um
+    dicionário com linhas lidas, inseridas, atualizadas e inalteradas,
+    além da duração e da taxa em linhas/s.
+    """
+    stats = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "batches": 0}
+    started = time.perf_counter()
+    try:
+        with engine.begin() as conn:
+            batch = {}
+            categories = {}
+            for item in items:
+                # Um mesmo ID duas vezes no lote faria o ON CONFLICT falhar
+                batch[item["id"]] = {column: item.get(column) for column in UPSERT_COLUMNS}
+                categories[item["id"]] = item.get("categories") or split_cats(item.get("cats"))
+                stats["rows"] += 1
+                if len(batch) >= batch_size:
+                    _write_batch(conn, batch, categories, stats)
+                    batch, categories = {}, {}
+            if batch:
+                _write_batch(conn, batch, categories, stats)
+    except SQLAlchemyError as e:
+        logging.info(f"Erro na carga em lote de convênios: {e}")
+        raise
+
+    elapsed = time.perf_counter() - started
+    POSTGRES_UPSERT_DURATION.observe(elapsed)
+    stats["unchanged"] = stats["rows"] - stats["inserted"] - stats["updated"]
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["rows"] / elapsed, 1) if elapsed else 0.0
+    logging.info(
+        f"Carga em lote: {stats['rows']} linhas em {stats['batches']} lotes "
+        f"({stats['inserted']} inseridas, {stats['updated']} atualizadas, {stats['unchanged']} inalteradas) "
+        f"em {stats['seconds']}s, {stats['rows_per_sec']} linhas/s"
+    )
+    return stats
+
+
+def _write_batch(conn, batch, categories, stats):
+    inserted, updated, written_ids = upsert_convenios_batch(conn, list(batch.values()))
+    # Só os convênios efetivamente gravados têm as categorias refeitas
+    replace_convenio_categories(conn, {convenio_id: categories[convenio_id] for convenio_id in written_ids})
+    stats["inserted"] += inserted
+    stats["updated"] += updated
+    stats["batches"] += 1
+
+
+def get_content_hashes():
+    """Retorna {id: content_hash} de todos os convênios."""
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(select(convenios_table.c.id, convenios_table.c.content_hash))
+            return {row.id: row.content_hash for row in result}
+    except SQLAlchemyError as e:
+        logging.info(f"Erro ao buscar hashes dos convênios: {e}")
+        return {}
+
+
+def delete_convenios(ids):
+    """Remove os convênios com os IDs informados."""
+    if not ids:
+        return 0
+    try:
+        with engine.begin() as conn:
+            result = conn.execute(convenios_table.delete().where(convenios_table.c.id.in_(list(ids))))
+            return result.rowcount
+    except SQLAlchemyError as e:
+        logging.info(f"Erro ao remover convênios: {e}")
+        return 0
+
+
 def count_convenios(search_text=None, cat=None):
-    """Conta o número de convênios no banco de dados com suporte a filtros"""
+    """Conta o número de convênios no banco de dados com os mesmos filtros da busca"""
     try:
         with engine.connect() as conn:
-            query = select(func.count(convenios_table.c.id))  # Conte as IDs diretamente
-            
-            # Aplica filtro de busca
-            if search_text:
-                query = query.where(convenios_table.c.title.ilike(f"%{search_text}%"))
-            
-            # Aplica filtro de categoria
-            if cat:
-                query = query.where(convenios_table.c.cats.ilike(f"%{cat}%"))
-
-            # Executa a query
-            result = conn.execute(query)
+            where, params = build_search_filters(search_text, cat)
+            result = conn.execute(text(f"SELECT count(*) FROM convenios{where}"), params)
             return result.scalar()  # Retorna o valor do count
     except SQLAlchemyError as e:
         logging.info(f"Erro ao contar convênios: {e}")
-        return 0
+        raise
     
+def iter_convenios(since=None, batch_size=1000):
+    """Itera sobre os convênios com um cursor no servidor, em memória constante.
+
+    `since` (epoch em segundos) limita aos convênios gravados depois desse
+    momento. updated_at sai como epoch em segundos, igual ao do Meilisearch.
+    """
+    columns = [column for column in convenios_table.c if column.name != "search_vector"]
+    query = select(*columns)
+    if since is not None:
+        query = query.where(convenios_table.c.updated_at > datetime.fromtimestamp(since, tz=timezone.utc))
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for row in result:
+            convenio = dict(row._mapping)
+            if convenio["updated_at"] is not None:
+                convenio["updated_at"] = int(convenio["updated_at"].timestamp())
+            yield convenio
+
+
+def iter_titles(batch_size=5000):
+    """Itera sobre {"id", "title"} de todos os convênios, com um cursor no servidor."""
+    query = select(convenios_table.c.id, convenios_table.c.title)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for row in result:
+            yield dict(row._mapping)
+
+
 def get_all_convenios():
     """Retorna todos os convênios"""
     try:
@@ -212,13 +557,14 @@ def find_convenio_by_id(id):
     """Busca um convênio pelo ID"""
     try:
         with engine.connect() as conn:
-            query = select(convenios_table).where(convenios_table.c.id == id)
+            columns = [column for column in convenios_table.c if column.name != "search_vector"]
+            query = select(*columns).where(convenios_table.c.id == id)
             result = conn.execute(query)
             convenio = result.fetchone()
             return dict(convenio._mapping) if convenio else None
     except SQLAlchemyError as e:
         logging.info(f"Erro ao buscar convênio por ID: {e}")
-        return None 
+        raise
     
 def clear_convenios():
     """Limpa todos os convênios do banco de dados"""
@@ -232,13 +578,13 @@ def clear_convenios():
 def get_unique_cats():
     """Retorna uma lista de categorias únicas"""
     try:
-        cats = []
         with engine.connect() as conn:
-            query = select(convenios_table.c.cats)
-            result = conn.execute(query)
-            for row in result:
-                cats.extend(row[0].split(","))
-        return sorted(set(cats))
+            query = (
+                select(categories_table.c.name)
+                .where(categories_table.c.convenio_count > 0)
+                .order_by(categories_table.c.name)
+            )
+            return [row.name for row in conn.execute(query)]
     except SQLAlchemyError as e:
         logging.info(f"Erro ao buscar categorias únicas: {e}")
         return []
@@ -248,7 +594,12 @@ def get_convenios_by_cat(cat):
     """Retorna convênios por categoria"""
     try:
         with engine.connect() as conn:
-            query = select(convenios_table).where(convenios_table.c.cats.ilike(f"%{cat}%"))
+            query = (
+                select(convenios_table)
+                .join(convenio_categories_table, convenio_categories_table.c.convenio_id == convenios_table.c.id)
+                .join(categories_table, categories_table.c.id == convenio_categories_table.c.category_id)
+                .where(categories_table.c.name == cat)
+            )
             result = conn.execute(query)
             convenios = [dict(row._mapping) for row in result]
             return convenios
@@ -270,4 +621,37 @@ def update_coalesce():
             """))
         logging.info("Coluna 'content' atualizada com sucesso!")
     except SQLAlchemyError as e:
-        logging.info(f"Erro ao atualizar coluna 'content': {e}")
\ No newline at end of file
+        logging.info(f"Erro ao atualizar coluna 'content': {e}")
+
+
+def suggest_titles(search_text, limit=5):
+    """Sugestões de títulos para autocompletar, usando o índice de trigramas de title."""
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(
+                text("SELECT id, title FROM convenios WHERE title ILIKE :ilike_text ORDER BY title LIMIT :limit"),
+                {"ilike_text": f"%{search_text}%", "limit": limit},
+            )
+            return [dict(row._mapping) for row in result]
+    except SQLAlchemyError as e:
+        logging.info(f"Erro ao buscar sugestões: {e}")
+        raise
+
+
+def count_cats():
+    """Retorna as categorias com a quantidade de convênios de cada uma.
+
+    Lê a contagem mantida em categories.convenio_count, sem agregar convênios.
+    """
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT name, convenio_count AS count
+                FROM categories
+                WHERE convenio_count > 0
+                ORDER BY name
+            """))
+            return [dict(row._mapping) for row in result]
+    except SQLAlchemyError as e:
+        logging.info(f"Erro ao contar categorias: {e}")
+        raise
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+import time
+
+# Geração do índice de busca: um contador incrementado sempre que uma coleta
+# ou reindexação termina. Caches em memória guardam a geração com que cada
+# entrada foi criada e a descartam quando ela muda.
+#
+# O valor fica também em um arquivo, para que outros processos (workers do
+# servidor e o processo de coleta) enxerguem a mesma geração; o arquivo é
+# relido no máximo uma vez a cada CHECK_INTERVAL segundos.
+GENERATION_FILE = os.getenv(
+    "INDEX_GENERATION_FILE", os.path.join(tempfile.gettempdir(), "convenios_index_generation")
+)
+CHECK_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_generation = 0
+_changed_at = None
+_checked_at = 0.0
+
+
+def _read_file():
+    try:
+        with open(GENERATION_FILE, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _read_mtime():
+    try:
+        return os.path.getmtime(GENERATION_FILE)
+    except OSError:
+        return None
+
+
+def current_generation():
+    """Retorna a geração atual do índice."""
+    global _generation, _changed_at, _checked_at
+    now = time.monotonic()
+    if now - _checked_at >= CHECK_INTERVAL:
+        with _lock:
+            _generation = max(_generation, _read_file())
+            _changed_at = _read_mtime()
+            _checked_at = now
+    return _generation
+
+
+def generation_changed_at():
+    """Momento (epoch) em que a geração atual começou, ou None se nunca houve troca."""
+    current_generation()
+    return _changed_at
+
+
+def generation_tag():
+    """Identifica a geração de forma estável entre reinícios, para uso em ETags."""
+    generation = current_generation()
+    return f"{generation}.{int(_changed_at or 0)}"
+
+
+def bump_generation():
+    """Avança a geração, invalidando os caches de todos os processos."""
+    global _generation, _changed_at, _checked_at
+    with _lock:
+        _generation = max(_generation, _read_file()) + 1
+        tmp_path = f"{GENERATION_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(_generation))
+        os.replace(tmp_path, GENERATION_FILE)
+        _changed_at = _read_mtime()
+        _checked_at = time.monotonic()
+        return _generation
@@ -0,0 +1,219 @@
+import os
+import time
+
+from server.logging import logging
+from server.metrics import observe_task
+
+# Quantidade de documentos lidos por requisição ao listar o índice
+FETCH_PAGE_SIZE = 1000
+# Tempo máximo de espera por uma tarefa do Meilisearch
+TASK_TIMEOUT_MS = 120000
+# Fração mínima de documentos do índice ativo que um índice sombra precisa
+# ter para ser promovido
+MIN_DOCUMENT_RATIO = 0.8
+# Teto de resultados que uma busca alcança no Meilisearch (padrão dele: 1000).
+# Precisa cobrir o catálogo inteiro, senão as páginas e os cursores param aí
+MAX_TOTAL_HITS = int(os.getenv("MEILISEARCH_MAX_TOTAL_HITS", 100000))
+
+# Configurações desejadas do índice de convênios. apply_index_settings só
+# envia ao Meilisearch as chaves que diferem do que já está aplicado, porque
+# cada alteração de configuração reindexa todos os documentos.
+INDEX_SETTINGS = {
+    "sortableAttributes": ["date", "title", "cats"],
+    # updated_at: exportação só do que mudou desde um momento (since=)
+    "filterableAttributes": ["categories", "updated_at"],
+    # A lista de categorias vem da distribuição de facetas de "categories"
+    "faceting": {"maxValuesPerFacet": 1000},
+    "pagination": {"maxTotalHits": MAX_TOTAL_HITS},
+}
+# Chaves cuja ordem não importa na comparação
+UNORDERED_SETTINGS = {"sortableAttributes", "filterableAttributes"}
+
+
+def fetch_document_hashes(index):
+    """Retorna um dicionário {id: content_hash} com todos os documentos do índice."""
+    hashes = {}
+    offset = 0
+    while True:
+        page = index.get_documents({
+            "fields": ["id", "content_hash"],
+            "limit": FETCH_PAGE_SIZE,
+            "offset": offset,
+        })
+        for document in page.results:
+            document = dict(document) if not isinstance(document, dict) else document
+            hashes[document["id"]] = document.get("content_hash")
+        offset += FETCH_PAGE_SIZE
+        if offset >= page.total:
+            return hashes
+
+
+def iter_documents(index, filter=None, page_size=FETCH_PAGE_SIZE, fields=None):
+    """Itera sobre os documentos do índice, uma página de cada vez (só `fields`, se informados)."""
+    offset = 0
+    while True:
+        parameters = {"limit": page_size, "offset": offset}
+        if filter:
+            parameters["filter"] = filter
+        if fields:
+            parameters["fields"] = fields
+        page = index.get_documents(parameters)
+        for document in page.results:
+            yield dict(document) if not isinstance(document, dict) else document
+        offset += page_size
+        if offset >= page.total:
+            return
+
+
+def wait_for_tasks(client, task_uids, timeout_in_ms=TASK_TIMEOUT_MS):
+    """Espera as tarefas terminarem; falha se alguma delas não tiver sucesso."""
+    for task_uid in task_uids:
+        task = client.wait_for_task(task_uid, timeout_in_ms=timeout_in_ms)
+        observe_task(task)
+        if task.status != "succeeded":
+            raise RuntimeError(f"Tarefa {task_uid} do Meilisearch terminou com status '{task.status}': {task.error}")
+
+
+class TaskTracker:
+    """Acompanha as tarefas assíncronas do Meilisearch até que terminem."""
+
+    def __init__(self, client, timeout_in_ms=TASK_TIMEOUT_MS):
+        self.client = client
+        self.timeout_in_ms = timeout_in_ms
+        self.pending = []
+
+    def track(self, task_info):
+        self.pending.append(task_info.task_uid)
+        return task_info.task_uid
+
+    def wait_oldest(self):
+        wait_for_tasks(self.client, [self.pending.pop(0)], self.timeout_in_ms)
+
+    def wait_all(self):
+        while self.pending:
+            self.wait_oldest()
+
+    def __len__(self):
+        return len(self.pending)
+
+
+def settings_diff(current, desired=INDEX_SETTINGS):
+    """Retorna apenas as configurações desejadas que diferem das atuais."""
+    diff = {}
+    for key, value in desired.items():
+        applied = current.get(key)
+        if key in UNORDERED_SETTINGS:
+            if set(applied or []) != set(value):
+                diff[key] = value
+        elif isinstance(value, dict):
+            # Compara só as subchaves declaradas; o Meilisearch devolve outras
+            if any((applied or {}).get(subkey) != subvalue for subkey, subvalue in value.items()):
+                diff[key] = value
+        elif applied != value:
+            diff[key] = value
+    return diff
+
+
+def apply_index_settings(client, index_name, desired=INDEX_SETTINGS):
+    """Aplica as configurações do índice se necessário e espera a conclusão.
+
+    Deve ser chamado antes de enviar documentos, para que o Meilisearch não
+    indexe o corpus duas vezes.
+    """
+    index = client.index(index_name)
+    diff = settings_diff(index.get_settings(), desired)
+    if not diff:
+        logging.info(f"[Indexer] Configurações do índice '{index_name}' já estão atualizadas.")
+        return {}
+
+    wait_for_tasks(client, [index.update_settings(diff).task_uid])
+    logging.info(f"[Indexer] Configurações aplicadas ao índice '{index_name}': {sorted(diff)}")
+    return diff
+
+
+def wait_for_index_tasks(client, index_name):
+    """Espera todas as tarefas enfileiradas ou em andamento de um índice."""
+    pending = client.get_tasks({"indexUids": [index_name], "statuses": ["enqueued", "processing"]})
+    wait_for_tasks(client, [task.uid for task in pending.results])
+
+
+def ensure_index(client, index_name):
+    """Cria o índice se ele ainda não existir."""
+    try:
+        client.get_index(index_name)
+    except Exception:
+        wait_for_tasks(client, [client.create_index(index_name, {"primaryKey": "id"}).task_uid])
+
+
+def count_documents(client, index_name):
+    return client.index(index_name).get_stats().number_of_documents
+
+
+def list_generations(client, index_name):
+    """Retorna as gerações (<index_name>_<geração>) existentes, da mais nova para a mais antiga."""
+    prefix = f"{index_name}_"
+    generations = []
+    for index in client.get_indexes({"limit": 1000})["results"]:
+        suffix = index.uid[len(prefix):]
+        if index.uid.startswith(prefix) and suffix.isdigit():
+            generations.append(int(suffix))
+    return sorted(generations, reverse=True)
+
+
+def create_shadow_index(client, index_name):
+    """Cria e configura um índice sombra vazio para uma nova geração."""
+    generation = int(time.time())
+    shadow_name = f"{index_name}_{generation}"
+    ensure_index(client, shadow_name)
+    # As configurações são aplicadas antes de receber documentos
+    apply_index_settings(client, shadow_name)
+    logging.info(f"[Indexer] Índice sombra '{shadow_name}' criado.")
+    return shadow_name
+
+
+def discard_shadow_index(client, shadow_name):
+    """Remove um índice sombra que não chegou a ser promovido."""
+    try:
+        client.delete_index(shadow_name)
+        logging.info(f"[Indexer] Índice sombra '{shadow_name}' descartado.")
+    except Exception as e:
+        logging.error(f"[Indexer] Erro ao descartar índice sombra '{shadow_name}': {e}")
+
+
+def promote_shadow_index(client, index_name, shadow_name, min_ratio=MIN_DOCUMENT_RATIO):
+    """Troca atomicamente o índice ativo pelo índice sombra.
+
+    Antes da troca, espera todas as tarefas do índice sombra terminarem e
+    confere a contagem de documentos contra o índice ativo. Depois da troca,
+    o nome do índice sombra passa a guardar a geração anterior, mantida para
+    rollback; gerações mais antigas são removidas.
+    """
+    wait_for_index_tasks(client, shadow_name)
+
+    ensure_index(client, index_name)
+    shadow_count = count_documents(client, shadow_name)
+    live_count = count_documents(client, index_name)
+    if shadow_count == 0 or shadow_count < live_count * min_ratio:
+        raise RuntimeError(
+            f"Índice sombra '{shadow_name}' tem {shadow_count} documentos contra {live_count} "
+            f"no índice ativo; troca cancelada."
+        )
+
+    wait_for_tasks(client, [client.swap_indexes([{"indexes": [index_name, shadow_name]}]).task_uid])
+    logging.info(f"[Indexer] Índice '{shadow_name}' promovido ({shadow_count} documentos, antes {live_count}).")
+
+    current_generation = int(shadow_name[len(index_name) + 1:])
+    for generation in list_generations(client, index_name):
+        if generation != current_generation:
+            client.delete_index(f"{index_name}_{generation}")
+
+
+def rollback_index(client, index_name):
+    """Volta o índice ativo para a geração anterior, trocando-os de novo."""
+    generations = list_generations(client, index_name)
+    if not generations:
+        raise RuntimeError("Nenhuma geração anterior disponível para rollback.")
+    previous_name = f"{index_name}_{generations[0]}"
+    wait_for_tasks(client, [client.swap_indexes([{"indexes": [index_name, previous_name]}]).task_uid])
+    logging.info(f"[Indexer] Rollback: '{index_name}' trocado com '{previous_name}'.")
+    return previous_name
@@ -0,0 +1,165 @@
+import os
+import re
+import time
+
+from flask import Response, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Com vários processos (workers do gunicorn e o crawl worker), defina
+# PROMETHEUS_MULTIPROC_DIR com um diretório vazio compartilhado: cada processo
+# grava ali suas métricas e /metrics soma todas.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP, por rota",
+    ["method", "route", "status"],
+)
+BACKEND_LATENCY = Histogram(
+    "search_backend_call_duration_seconds",
+    "Latência das chamadas ao backend de busca",
+    ["backend", "operation"],
+)
+BACKEND_ERRORS = Counter(
+    "search_backend_errors_total",
+    "Chamadas ao backend de busca que falharam",
+    ["backend", "operation"],
+)
+CACHE_LOOKUPS = Counter(
+    "response_cache_lookups_total",
+    "Consultas aos caches de resposta, por resultado (hit ou miss)",
+    ["cache", "result"],
+)
+CRAWL_RUNS = Counter("crawl_runs_total", "Coletas terminadas, por motivo", ["reason"])
+CRAWL_PAGES = Counter("crawl_pages_total", "Páginas baixadas pelas coletas")
+CRAWL_ITEMS = Counter("crawl_items_total", "Convênios extraídos pelas coletas")
+CRAWL_BYTES = Counter("crawl_response_bytes_total", "Bytes baixados pelas coletas")
+CRAWL_ERRORS = Counter("crawl_errors_total", "Erros registrados pelas coletas")
+CRAWL_DURATION = Histogram(
+    "crawl_duration_seconds",
+    "Duração das coletas",
+    buckets=(30, 60, 120, 300, 600, 1200, 1800, 3600, 7200),
+)
+INDEX_TASK_DURATION = Histogram(
+    "meilisearch_task_duration_seconds",
+    "Duração das tarefas do Meilisearch, informada pelo próprio Meilisearch",
+    ["type", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+POSTGRES_UPSERT_DURATION = Histogram(
+    "postgres_bulk_upsert_duration_seconds",
+    "Duração das cargas em lote no Postgres",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+ISO_DURATION_RE = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?)?$")
+
+
+def parse_duration(value):
+    """Segundos de uma duração ISO 8601 como as do Meilisearch ("PT1M2.5S"), ou None."""
+    match = ISO_DURATION_RE.match(value or "")
+    if not match:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return int(days or 0) * 86400 + int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds or 0)
+
+
+def observe_task(task):
+    """Registra a duração de uma tarefa terminada do Meilisearch."""
+    duration = parse_duration(getattr(task, "duration", None))
+    if duration is not None:
+        INDEX_TASK_DURATION.labels(type=getattr(task, "type", "unknown"), status=task.status).observe(duration)
+
+
+def observe_crawl(event):
+    """Soma as estatísticas de uma coleta terminada (evento "finished" do crawl worker)."""
+    if event["type"] != "finished":
+        return
+    CRAWL_RUNS.labels(reason=event["reason"]).inc()
+    stats = event.get("stats")
+    if stats:
+        CRAWL_PAGES.inc(stats["pages_crawled"])
+        CRAWL_ITEMS.inc(stats["items_scraped"])
+        CRAWL_BYTES.inc(stats["bytes"])
+        CRAWL_ERRORS.inc(stats["errors"])
+        CRAWL_DURATION.observe(stats["elapsed_seconds"])
+
+
+class InstrumentedBackend:
+    """Envolve um SearchBackend medindo a latência e os erros de cada chamada.
+
+    export() e titles() retornam iteradores que só consultam o backend quando
+    percorridos; para eles, a latência vai da chamada até o iterador se
+    esgotar, falhar ou ser fechado.
+    """
+
+    OPERATIONS = ("search", "suggest", "categories", "get_convenio")
+    STREAMING_OPERATIONS = ("export", "titles")
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+
+    def __getattr__(self, attribute):
+        target = getattr(self.backend, attribute)
+        if attribute not in self.OPERATIONS and attribute not in self.STREAMING_OPERATIONS:
+            return target
+        streaming = attribute in self.STREAMING_OPERATIONS
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = target(*args, **kwargs)
+            except Exception:
+                self._observe(attribute, started, failed=True)
+                raise
+            if streaming:
+                return self._iterate(attribute, result, started)
+            self._observe(attribute, started)
+            return result
+
+        return call
+
+    def _iterate(self, operation, iterator, started):
+        failed = False
+        try:
+            yield from iterator
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._observe(operation, started, failed)
+
+    def _observe(self, operation, started, failed=False):
+        if failed:
+            BACKEND_ERRORS.labels(backend=self.name, operation=operation).inc()
+        BACKEND_LATENCY.labels(backend=self.name, operation=operation).observe(time.perf_counter() - started)
+
+
+def init_metrics(app):
+    """Mede a latência de todas as rotas e expõe GET /metrics no formato do Prometheus."""
+
+    @app.before_request
+    def start_timer():
+        request.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = getattr(request, "metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.labels(
+                method=request.method, route=route, status=str(response.status_code)
+            ).observe(time.perf_counter() - started)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            data = generate_latest(registry)
+        else:
+            data = generate_latest()
+        return Response(data, mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,49 @@
+import base64
+import json
+
+# Maior page_size aceito em qualquer modo de paginação
+MAX_PAGE_SIZE = 100
+# Paginação por offset só até esta página; depois disso, use o cursor
+MAX_OFFSET_PAGE = 10
+
+
+def encode_cursor(sort_by, order, position, search="", category=""):
+    """Cursor opaco: a consulta, a ordenação e a posição do último item entregue.
+
+    `position` depende do backend: no Postgres é {"value", "id"} (chave de
+    ordenação e ID do último item); no Meilisearch é {"offset"}. A busca e a
+    categoria vão junto para que o cursor não sirva para outra consulta.
+    """
+    payload = json.dumps(
+        {"s": sort_by, "o": order, "q": search, "c": category, "p": position}, separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def valid_position(position):
+    """True se a posição tem um dos formatos que os backends produzem."""
+    if not isinstance(position, dict):
+        return False
+    if set(position) == {"offset"}:
+        offset = position["offset"]
+        return isinstance(offset, int) and not isinstance(offset, bool) and offset >= 0
+    if set(position) == {"value", "id"}:
+        return isinstance(position["value"], str) and isinstance(position["id"], str)
+    return False
+
+
+def decode_cursor(cursor, sort_by, order, search="", category=""):
+    """Retorna a posição guardada no cursor; ValueError se ele for inválido ou de outra consulta."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        position = payload["p"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+    if not valid_position(position):
+        raise ValueError("Cursor inválido")
+    if payload.get("s") != sort_by or payload.get("o") != order:
+        raise ValueError("Cursor não corresponde à ordenação pedida")
+    if payload.get("q") != search or payload.get("c") != category:
+        raise ValueError("Cursor não corresponde à busca pedida")
+    return position
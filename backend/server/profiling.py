@@ -0,0 +1,184 @@
+import hashlib
+import hmac
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import g, jsonify, request
+
+# Sem PROFILE_SECRET o perfilamento fica desligado por completo: nenhum hook é
+# registrado e as rotas de administração não existem.
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+# Fração das requisições perfiladas por amostragem (0 = só as com X-Profile)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Quantas das requisições mais lentas ficam guardadas, por processo
+PROFILE_SLOW_CAPACITY = int(os.getenv("PROFILE_SLOW_CAPACITY", 50))
+# Cabeçalho com um token assinado ("<expira_em>.<hmac>") que força o perfilamento
+PROFILE_HEADER = "X-Profile"
+
+_current = ContextVar("profile", default=None)
+
+
+def current_profile():
+    """Perfil da requisição em andamento, ou None quando ela não está sendo perfilada.
+
+    Os pontos instrumentados só marcam etapas quando há perfil:
+
+        profile = current_profile()
+        ...
+        if profile:
+            profile.lap("backend")
+    """
+    return _current.get()
+
+
+def sign_token(secret, expires_at):
+    """Token para o cabeçalho X-Profile, válido até `expires_at` (epoch em segundos)."""
+    signature = hmac.new(secret.encode("utf-8"), str(int(expires_at)).encode("utf-8"), hashlib.sha256)
+    return f"{int(expires_at)}.{signature.hexdigest()}"
+
+
+def verify_token(secret, token):
+    expires_at, _, _ = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(sign_token(secret, int(expires_at)), token)
+
+
+class RequestProfile:
+    """Cronômetro por etapas: cada lap() registra o tempo desde a etapa anterior."""
+
+    def __init__(self, trigger):
+        self.trigger = trigger
+        self.started = self.last = time.perf_counter()
+        self.stages = {}
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self.last)
+        self.last = now
+
+    def total(self):
+        return self.last - self.started
+
+
+class SlowLog:
+    """As `capacity` requisições perfiladas mais lentas, num heap de tamanho fixo."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.heap = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def record(self, entry):
+        item = (entry["total_ms"], next(self.counter), entry)
+        with self.lock:
+            if len(self.heap) < self.capacity:
+                heapq.heappush(self.heap, item)
+            elif item[0] > self.heap[0][0]:
+                heapq.heapreplace(self.heap, item)
+
+    def slowest(self):
+        with self.lock:
+            return [entry for _, _, entry in sorted(self.heap, reverse=True)]
+
+    def clear(self):
+        with self.lock:
+            self.heap.clear()
+
+
+class Profiler:
+    def __init__(self, secret, sample_rate=0.0, capacity=PROFILE_SLOW_CAPACITY):
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.slow_log = SlowLog(capacity)
+
+    def trigger(self):
+        """Motivo para perfilar a requisição atual ("header" ou "sample"), ou None."""
+        token = request.headers.get(PROFILE_HEADER)
+        if token and verify_token(self.secret, token):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def authorized(self):
+        expected = f"Bearer {self.secret}"
+        return hmac.compare_digest(request.headers.get("Authorization", ""), expected)
+
+
+def init_profiling(app, secret=PROFILE_SECRET):
+    """Perfilamento por etapas sob demanda, com GET/POST /admin/profiling.
+
+    Uma requisição é perfilada quando traz X-Profile com um token de
+    sign_token(PROFILE_SECRET, ...) ainda válido, ou por amostragem
+    (PROFILE_SAMPLE_RATE, ajustável em POST /admin/profiling). A resposta
+    perfilada traz Server-Timing com as etapas, e as mais lentas ficam em
+    GET /admin/profiling. As rotas de administração exigem
+    Authorization: Bearer <PROFILE_SECRET>.
+    """
+    if not secret:
+        return None
+    profiler = Profiler(secret, PROFILE_SAMPLE_RATE)
+
+    @app.before_request
+    def start_profile():
+        trigger = profiler.trigger()
+        if trigger:
+            g.profile_token = _current.set(RequestProfile(trigger))
+
+    @app.after_request
+    def finish_profile(response):
+        profile = _current.get()
+        if profile is None:
+            return response
+        profile.lap("response")
+        stages = {stage: round(seconds * 1000, 3) for stage, seconds in profile.stages.items()}
+        response.headers["Server-Timing"] = ", ".join(f"{stage};dur={ms}" for stage, ms in stages.items())
+        profiler.slow_log.record({
+            "method": request.method,
+            "path": request.path,
+            "args": request.args.to_dict(),
+            "status": response.status_code,
+            "trigger": profile.trigger,
+            "at": round(time.time(), 3),
+            "total_ms": round(profile.total() * 1000, 3),
+            "stages": stages,
+        })
+        return response
+
+    @app.teardown_request
+    def reset_profile(exc):
+        token = g.pop("profile_token", None)
+        if token is not None:
+            _current.reset(token)
+
+    @app.route("/admin/profiling", methods=["GET", "POST"])
+    def admin_profiling():
+        if not profiler.authorized():
+            return jsonify({"ok": False, "message": "Não autorizado"}), 401
+        if request.method == "POST":
+            payload = request.get_json(silent=True) or {}
+            if "sample_rate" in payload:
+                try:
+                    sample_rate = float(payload["sample_rate"])
+                except (TypeError, ValueError):
+                    sample_rate = -1
+                if not 0 <= sample_rate <= 1:
+                    return jsonify({"ok": False, "message": "sample_rate deve estar entre 0 e 1"}), 400
+                profiler.sample_rate = sample_rate
+            if payload.get("clear"):
+                profiler.slow_log.clear()
+        return jsonify({
+            "ok": True,
+            "sample_rate": profiler.sample_rate,
+            "capacity": profiler.slow_log.capacity,
+            "slowest": profiler.slow_log.slowest(),
+        })
+
+    return profiler
@@ -1,7 +1,144 @@
-SCRAPE_STATUS = {
-    "pages_crawled": 0,
-    "items_scraped": 0,
-    "finished": True,            # se o spider já finalizou
-    "error": None,
-    "scraping_in_progress": False
-}
\ No newline at end of file
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Máximo de emissões de progresso por segundo, para todos os clientes
+PROGRESS_MAX_EMITS_PER_SEC = float(os.getenv("PROGRESS_MAX_EMITS_PER_SEC", 2))
+# Último estado publicado, compartilhado entre os processos do servidor
+PROGRESS_FILE = os.getenv("PROGRESS_FILE", os.path.join(tempfile.gettempdir(), "convenios_progress.json"))
+
+
+class CrawlProgress:
+    """Estado da coleta em andamento, alimentado pelas estatísticas do crawl worker.
+
+    As atualizações só alteram o estado e incrementam `version`; o envio aos
+    clientes fica com broadcast_loop(), que emite no máximo
+    PROGRESS_MAX_EMITS_PER_SEC vezes por segundo e só quando algo mudou.
+    Assim o custo para os clientes não depende de quão verbosa é a coleta.
+    Cada emissão também grava o estado em PROGRESS_FILE, para que GET
+    /progress responda igual em qualquer processo do servidor.
+    """
+
+    def __init__(self, max_emits_per_sec=PROGRESS_MAX_EMITS_PER_SEC):
+        self.interval = 1.0 / max_emits_per_sec
+        self.lock = threading.Lock()
+        self.version = 0
+        # Convênios da última coleta concluída; base para a estimativa de término
+        self.last_total = None
+        self._reset(scraping=False)
+
+    def _reset(self, scraping):
+        self.pages_crawled = 0
+        self.items_scraped = 0
+        self.items_indexed = 0
+        self.errors = 0
+        self.expected_items = self.last_total
+        self.phase = "crawling" if scraping else "idle"
+        self.mode = None
+        self.started_at = time.time() if scraping else None
+        self.finished_at = None
+        self.scraping_in_progress = scraping
+        self.finished = not scraping
+        self.error = None
+        # Estado inicial de um processo novo perde para o publicado por outro
+        self.updated_at = time.time() if scraping else 0.0
+
+    def start(self, mode):
+        with self.lock:
+            self._reset(scraping=True)
+            self.mode = mode
+            self.version += 1
+
+    def update(self, stats):
+        """Atualiza os contadores a partir do resumo de estatísticas do worker."""
+        with self.lock:
+            self.pages_crawled = stats["pages_crawled"]
+            self.items_scraped = stats["items_scraped"]
+            self.items_indexed = stats["items_indexed"]
+            self.errors = stats["errors"]
+            self.version += 1
+            self.updated_at = time.time()
+
+    def set_phase(self, phase):
+        with self.lock:
+            self.phase = phase
+            self.version += 1
+            self.updated_at = time.time()
+
+    def finish(self, error=None):
+        with self.lock:
+            self.phase = "error" if error else "done"
+            self.error = error
+            self.finished = True
+            self.scraping_in_progress = False
+            self.finished_at = time.time()
+            if not error:
+                self.last_total = self.items_scraped
+            self.version += 1
+            self.updated_at = time.time()
+
+    def eta_seconds(self):
+        """Segundos estimados até o fim da coleta, pelo ritmo atual e pelo total da última coleta."""
+        if not self.scraping_in_progress or not self.expected_items or not self.items_scraped:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.expected_items - self.items_scraped, 0)
+        return round(remaining * elapsed / self.items_scraped, 1)
+
+    def snapshot(self):
+        with self.lock:
+            end = self.finished_at or time.time()
+            return {
+                "pages_crawled": self.pages_crawled,
+                "items_scraped": self.items_scraped,
+                "items_indexed": self.items_indexed,
+                "errors": self.errors,
+                "expected_items": self.expected_items,
+                "eta_seconds": self.eta_seconds(),
+                "elapsed_seconds": round(end - self.started_at, 1) if self.started_at else None,
+                "phase": self.phase,
+                "mode": self.mode,
+                "finished": self.finished,
+                "error": self.error,
+                "scraping_in_progress": self.scraping_in_progress,
+                "updated_at": self.updated_at,
+            }
+
+    def shared_snapshot(self):
+        """O estado mais recente entre o deste processo e o publicado por outro processo."""
+        state = self.snapshot()
+        try:
+            with open(PROGRESS_FILE, encoding="utf-8") as f:
+                published = json.load(f)
+        except (OSError, ValueError):
+            return state
+        return published if published.get("updated_at", 0) > state["updated_at"] else state
+
+    def publish(self, state):
+        tmp_path = f"{PROGRESS_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, PROGRESS_FILE)
+        except OSError:
+            pass
+
+    def broadcast_loop(self, socketio):
+        """Emite 'scrapy_progress' quando o estado muda, no máximo uma vez por intervalo."""
+        emitted = self.version
+        while True:
+            socketio.sleep(self.interval)
+            if self.version == emitted:
+                continue
+            emitted = self.version
+            state = self.snapshot()
+            self.publish(state)
+            message = f"{state['pages_crawled']} páginas, {state['items_scraped']} convênios, {state['items_indexed']} indexados"
+            if state["eta_seconds"] is not None:
+                message += f" (~{int(state['eta_seconds'])}s restantes)"
+            socketio.emit("scrapy_progress", {"message": message, **state})
+
+
+progress = CrawlProgress()
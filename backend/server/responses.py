@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+import os
+from email.utils import formatdate
+
+from flask import Response, request
+
+from server.cache import ResponseCache
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele, só gzip
+    brotli = None
+
+# Respostas menores que isso vão sem compressão: o ganho não paga o custo
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Cache-Control das listagens (mudam a cada coleta) e dos convênios individuais
+LIST_CACHE_CONTROL = os.getenv("LIST_CACHE_CONTROL", "public, max-age=30, stale-while-revalidate=300")
+DETAIL_CACHE_CONTROL = os.getenv("DETAIL_CACHE_CONTROL", "public, max-age=300, stale-while-revalidate=3600")
+
+# Corpos já comprimidos, por (ETag, codificação); o ETag identifica o conteúdo
+compressed_cache = ResponseCache(
+    "compressed",
+    max_entries=int(os.getenv("COMPRESSED_CACHE_MAX_ENTRIES", 2048)),
+    max_bytes=int(os.getenv("COMPRESSED_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+    ttl=float(os.getenv("COMPRESSED_CACHE_TTL", 3600)),
+)
+
+
+def make_etag(*parts):
+    """ETag (sem aspas) a partir das partes que determinam o conteúdo da resposta."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:24]
+
+
+def not_modified(etag, last_modified=None):
+    """True se o cliente já tem esta versão (If-None-Match ou, na falta dele, If-Modified-Since)."""
+    if request.if_none_match:
+        # A versão comprimida tem o sufixo da codificação no ETag
+        return any(request.if_none_match.contains_weak(tag) for tag in (etag, f"{etag}-gzip", f"{etag}-br"))
+    if last_modified and request.if_modified_since:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def _cache_headers(etag, last_modified, cache_control):
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified_response(etag, last_modified=None, cache_control=LIST_CACHE_CONTROL):
+    response = Response(status=304, headers=_cache_headers(etag, last_modified, cache_control))
+    response.set_etag(etag)
+    return response
+
+
+def _negotiate(size):
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    if brotli is not None and request.accept_encodings["br"]:
+        return "br"
+    if request.accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def json_response(body, etag, last_modified=None, cache_control=LIST_CACHE_CONTROL, headers=None):
+    """Resposta JSON com ETag, Last-Modified, Cache-Control e compressão negociada.
+
+    `body` é o JSON já serializado. Se o cliente já tem esta versão, responde
+    304 sem corpo.
+    """
+    if not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified, cache_control)
+
+    data = body.encode("utf-8") if isinstance(body, str) else body
+    response_headers = {**_cache_headers(etag, last_modified, cache_control), **(headers or {})}
+
+    encoding = _negotiate(len(data))
+    if encoding:
+        compressed = compressed_cache.get((etag, encoding))
+        if compressed is None:
+            compressed = _compress(data, encoding)
+            compressed_cache.set((etag, encoding), compressed, len(compressed))
+        data = compressed
+        response_headers["Content-Encoding"] = encoding
+        etag = f"{etag}-{encoding}"
+
+    response = Response(data, mimetype="application/json", headers=response_headers)
+    response.set_etag(etag)
+    return response
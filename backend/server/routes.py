@@ -1,25 +1,50 @@
-from flask import Blueprint, jsonify, request
-from threading import Lock
-import os
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from datetime import datetime, timezone
 import json
 import logging
-import subprocess
+import math
 import threading
-import uuid
-from meilisearch import Client
+import zlib
+from server.autocomplete import autocomplete
+from server.backends import INDEX_NAME, RESULT_FIELDS, SEARCH_BACKEND, VIEWS, client, get_backend
+from server.cache import categories_cache, convenios_cache, normalize_text, suggest_cache
+from server.crawler import CRAWL_TIMEOUT, CRAWL_WAIT_SLACK, crawl_worker
+from server.metrics import observe_crawl
+from server.profiling import current_profile
+from server.progress import progress
+from server.scheduler import crawl_lock, recrawl_scheduler
+from server.responses import (
+    DETAIL_CACHE_CONTROL,
+    compressed_cache,
+    json_response,
+    make_etag,
+    not_modified,
+    not_modified_response,
+)
+from server.generation import bump_generation, generation_changed_at, generation_tag
+from server.pagination import MAX_OFFSET_PAGE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from server.indexer import (
+    apply_index_settings,
+    create_shadow_index,
+    discard_shadow_index,
+    ensure_index,
+    promote_shadow_index,
+    rollback_index,
+    wait_for_index_tasks,
+)
 
 
 routes_bp = Blueprint("routes", __name__)
 
-spider_lock = Lock()
-spider_running = False
 socketio = None  # Inicialização será feita em app.py
 
-# Configura o cliente Meilisearch
-MEILISEARCH_URL = os.getenv("MEILISEARCH_URL", "http://localhost:7700")
-MEILISEARCH_API_KEY = os.getenv("MEILISEARCH_API_KEY", "masterKey")
-client = Client(MEILISEARCH_URL, MEILISEARCH_API_KEY)
-INDEX_NAME = "convenios"
+# A exportação junta linhas até este tamanho antes de enviar (e comprimir) um bloco
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Limites das sugestões de autocompletar
+SUGGESTIONS_IN_PAGE = 5
+SUGGEST_MAX_LIMIT = 10
+SUGGEST_MAX_QUERY_LENGTH = 100
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,217 +57,398 @@ logging.basicConfig(
 def init_socketio(sockio_instance):
     global socketio
     socketio = sockio_instance
+    # Um único emissor de progresso, com taxa limitada, para todos os clientes
+    socketio.start_background_task(progress.broadcast_loop, socketio)
+    # Recoletas automáticas (RECRAWL_INTERVAL); cada processo confere a agenda
+    # compartilhada, e a trava de coleta garante uma execução por vez
+    socketio.start_background_task(recrawl_scheduler.run_forever, start_crawl, socketio.sleep)
+
+
+def update_progress(event):
+    """Alimenta o progresso com as estatísticas que o worker de coleta envia."""
+    if event["type"] in ("stats", "finished") and event.get("stats"):
+        progress.update(event["stats"])
+
+
+crawl_worker.on_event(update_progress)
+crawl_worker.on_event(observe_crawl)
+
+def start_crawl(mode, scheduled=False):
+    """Pega a trava de coleta e inicia a coleta em uma thread.
+
+    Retorna False se já houver uma coleta em andamento, em qualquer processo.
+    Para uma coleta agendada, confere de novo a agenda já com a trava: outro
+    processo pode ter acabado de fazer a mesma coleta.
+    """
+    if not crawl_lock.acquire():
+        return False
+    if scheduled and not recrawl_scheduler.due():
+        crawl_lock.release()
+        return False
+    logging.info(f"[Flask] Iniciando coleta ({mode}{', agendada' if scheduled else ''})")
+    thread = threading.Thread(target=run_crawl, args=(mode,))
+    thread.start()
+    return True
 
-@routes_bp.route("/scrape", methods=["POST"])
-def scrape_data():
-    global spider_running
-    with spider_lock:
-        if spider_running:
-            return jsonify({"ok": False, "message": "Scraping já em andamento"}), 400
-        spider_running = True
-
-    def run_scrapy():
-        def process_convenios():
-            def configure_meilisearch_index():
-                """Configura o índice Meilisearch."""
-                try:
-                    # Configurar o índice
-                    index = client.index(INDEX_NAME)
-                    
-                    # Definir atributos de ordenação
-                    index.update_sortable_attributes(["date", "title", "cats"])
-                    
-                    # Definir atributos de filtragem
-                    index.update_filterable_attributes(["cats"])
-                    
-                    print(f"Atributos de ordenação configurados com sucesso para o índice '{INDEX_NAME}'.")
-
-                except Exception as e:
-                    print(f"Erro ao configurar o índice Meilisearch: {e}")
-            """Processa os convênios do arquivo JSON e indexa no Meilisearch."""
-            try:
-                # Caminho para o arquivo JSON
-                json_path = os.path.join(os.getcwd(), "myspider_project", "output", "convenios.json")
-            
-                if not os.path.exists(json_path):
-                    logging.error("[Flask] Arquivo JSON não encontrado")
-                    return {"ok": False, "message": "Arquivo JSON não encontrado"}
-
-                # Lê os convênios do arquivo JSON
-                with open(json_path, "r", encoding="utf-8") as f:
-                    convenios = json.load(f)
-
-                # Garante que o índice existe
-                try:
-                    client.create_index(INDEX_NAME, {"primaryKey": "id"})
-                except Exception:
-                    logging.info(f"[Flask] Índice '{INDEX_NAME}' já existe")
-                    
-                client.index(INDEX_NAME).delete_all_documents()
-                
-                # Adiciona um UUID único para cada convênio e indexa no Meilisearch
-                for convenio in convenios:
-                    convenio["id"] = str(uuid.uuid4())
-
-                client.index(INDEX_NAME).add_documents(convenios)
-                configure_meilisearch_index()
-                
-                logging.info("[Flask] Documentos processados e indexados com sucesso no Meilisearch.")
-
-                os.remove(json_path)  # Opcional: Remove o arquivo após o processamento
-                return {"ok": True, "message": "Dados processados e indexados com sucesso"}
-            except Exception as e:
-                logging.error(f"[Flask] Erro ao processar convênios: {str(e)}")
-                return {"ok": False, "message": f"Erro: {str(e)}"}
-            
+
+def run_crawl(mode):
+    """Executa uma coleta com a trava já presa, e a solta ao terminar."""
+    use_meilisearch = SEARCH_BACKEND == "meilisearch"
+    target_index = INDEX_NAME
+    stats = None
+    error = None
+    progress.start(mode)
+    try:
+        if mode == "rebuild":
+            target_index = create_shadow_index(client, INDEX_NAME)
+        elif use_meilisearch:
+            ensure_index(client, INDEX_NAME)
+            apply_index_settings(client, INDEX_NAME)
+
+        logging.info("[Flask] Executando Scrapy...")
+        # A coleta roda no processo do crawl_worker; os itens são indexados
+        # em lotes pelo pipeline do backend configurado durante a coleta
+        job_id = crawl_worker.submit({"MEILISEARCH_INDEX": target_index})
         try:
-            json_path = os.path.join(os.getcwd(), "myspider_project", "output", "convenios.json")
-            if os.path.exists(json_path):
-                os.remove(json_path)
-
-            scrapy_project_dir = os.path.join(os.getcwd(), "myspider_project")
-
-            logging.info("[Flask] Executando Scrapy...")
-            process = subprocess.Popen(
-                ["scrapy", "crawl", "convenio_spider"],
-                cwd=scrapy_project_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
+            # Um worker travado não pode segurar a crawl_lock para sempre. O
+            # pedido de cancelamento pode vir de qualquer processo do servidor
+            result = crawl_worker.wait(
+                job_id, timeout=CRAWL_TIMEOUT + CRAWL_WAIT_SLACK, cancel_if=crawl_lock.cancel_requested
             )
+        except TimeoutError:
+            # Nem o timeout do próprio worker funcionou: reinicia o processo
+            crawl_worker.stop()
+            raise
+        logging.info(f"[Flask] Coleta terminada ({result['reason']}): {result['stats']}")
+        if result["reason"] != "finished":
+            raise RuntimeError(result.get("error") or f"Coleta interrompida: {result['reason']}")
+        stats = result["stats"]
+
+        # Só reporta a conclusão depois que o Meilisearch terminou de indexar
+        progress.set_phase("indexing")
+        if mode == "rebuild":
+            promote_shadow_index(client, INDEX_NAME, target_index)
+        elif use_meilisearch:
+            wait_for_index_tasks(client, INDEX_NAME)
+        bump_generation()
+        # Índice de autocompletar da nova geração; os outros processos o
+        # reconstroem ao perceber a troca de geração
+        autocomplete.refresh()
+        progress.finish()
+        if socketio:
+            socketio.emit('scrapy_done', {'message': "Scraping concluído com sucesso"})
 
-            for line in process.stdout:
-                if socketio:
-                    socketio.emit('scrapy_progress', {'message': line.strip()})
-                logging.info(line.strip())
-
-            process.wait()
-            if process.returncode != 0:
-                if socketio:
-                    socketio.emit('scrapy_error', {'message': "Erro ao executar Scrapy"})
-                logging.error("[Flask] Erro ao executar Scrapy.")
-            else:
-                process_convenios()
-                if socketio:
-                    socketio.emit('scrapy_done', {'message': "Scraping concluído com sucesso"})
-
-        except Exception as e:
-            if socketio:
-                socketio.emit('scrapy_error', {'message': str(e)})
-            logging.error(f"[Flask] Erro: {str(e)}")
+    except Exception as e:
+        error = str(e)
+        progress.finish(error=error)
+        if socketio:
+            socketio.emit('scrapy_error', {'message': error})
+        logging.error(f"[Flask] Erro: {error}")
+        if target_index != INDEX_NAME:
+            # Um índice sombra incompleto não pode virar alvo de rollback
+            discard_shadow_index(client, target_index)
+    finally:
+        try:
+            # Manual ou agendada, toda coleta reinicia a contagem da próxima
+            recrawl_scheduler.record(mode, stats, error)
         finally:
-            global spider_running
-            spider_running = False
+            crawl_lock.release()
 
-    thread = threading.Thread(target=run_scrapy)
-    thread.start()
 
+@routes_bp.route("/scrape", methods=["POST"])
+def scrape_data():
+    # "incremental" atualiza o índice ativo com o delta; "rebuild" preenche um
+    # índice sombra e o troca atomicamente pelo ativo ao final
+    mode = (request.get_json(silent=True) or {}).get("mode", "incremental")
+    if mode not in ("incremental", "rebuild"):
+        return jsonify({"ok": False, "message": f"Modo inválido: {mode}"}), 400
+    # No Postgres a carga é sempre incremental (upsert em lote pelo PostgresPipeline)
+    if mode == "rebuild" and SEARCH_BACKEND != "meilisearch":
+        return jsonify({"ok": False, "message": "Modo 'rebuild' disponível apenas com o Meilisearch"}), 400
+
+    if not start_crawl(mode):
+        return jsonify({"ok": False, "message": "Scraping já em andamento"}), 400
     return jsonify({"ok": True, "message": "Scraping iniciado"}), 200
+
+
+@routes_bp.route("/scrape/schedule", methods=["GET"])
+def get_schedule():
+    """Agenda das recoletas automáticas: intervalo atual, próxima coleta e histórico."""
+    return jsonify(recrawl_scheduler.snapshot())
+
+
+@routes_bp.route("/progress", methods=["GET"])
+def get_progress():
+    """Estado atual da coleta; o mesmo conteúdo emitido em 'scrapy_progress'."""
+    return jsonify(progress.shared_snapshot())
+
+
+@routes_bp.route("/scrape/cancel", methods=["POST"])
+def cancel_scrape():
+    """Cancela a coleta em andamento; o índice sombra de um rebuild é descartado.
+
+    Funciona em qualquer processo: o pedido fica ao lado da trava de coleta e
+    o processo que executa a coleta o atende.
+    """
+    if not crawl_lock.request_cancel():
+        return jsonify({"ok": False, "message": "Nenhum scraping em andamento"}), 400
+    return jsonify({"ok": True, "message": "Cancelamento solicitado"}), 200
+
+
+@routes_bp.route("/rollback", methods=["POST"])
+def rollback():
+    """Volta o índice ativo para a geração mantida pelo último rebuild."""
+    # A trava impede que uma coleta comece no meio da troca
+    if not crawl_lock.acquire():
+        return jsonify({"ok": False, "message": "Scraping em andamento"}), 400
+    try:
+        previous = rollback_index(client, INDEX_NAME)
+        bump_generation()
+        return jsonify({"ok": True, "message": f"Índice trocado com '{previous}'"}), 200
+    except Exception as e:
+        logging.error(f"[Flask] Erro ao fazer rollback do índice: {str(e)}")
+        return jsonify({"ok": False, "message": str(e)}), 500
+    finally:
+        crawl_lock.release()
+
+
+@routes_bp.route("/suggest", methods=["GET"])
+def get_suggestions():
+    """Sugestões para autocompletar, pensado para ser chamado a cada tecla.
+
+    Cada item é {"type": "category", "name", "count"} ou {"type": "convenio",
+    "id", "title"}. Com o índice em memória pronto (server.autocomplete), a
+    resposta não sai do processo; antes disso, vem do backend de busca.
+    """
+    search_text = request.args.get("q", "").strip()[:SUGGEST_MAX_QUERY_LENGTH]
+    try:
+        limit = min(max(int(request.args.get("limit", SUGGESTIONS_IN_PAGE)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"ok": False, "message": "limit deve ser um número inteiro"}), 400
+    if not search_text:
+        return jsonify([])
+
+    index = autocomplete.current()
+    if index is not None:
+        return jsonify(index.suggest(search_text, limit))
+
+    cache_key = (normalize_text(search_text), limit)
+    cached = suggest_cache.get(cache_key)
+    if cached is not None:
+        return Response(cached, mimetype="application/json", headers={"X-Cache": "HIT"})
+
+    try:
+        suggestions = [{"type": "convenio", **item} for item in get_backend().suggest(search_text, limit)]
+        body = current_app.json.dumps(suggestions)
+        suggest_cache.set(cache_key, body, len(body))
+        return Response(body, mimetype="application/json", headers={"X-Cache": "MISS"})
+    except Exception as e:
+        logging.error(f"[Flask] Erro ao buscar sugestões: {str(e)}")
+        return jsonify([])
+
+
 @routes_bp.route("/convenios", methods=["GET"])
 def get_convenios():
-    index = client.index(INDEX_NAME)
-
     # Parâmetros da requisição
     search_text = request.args.get("search", "").strip()
-    page = int(request.args.get("page", 1))
-    page_size = int(request.args.get("page_size", 10))
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        page_size = min(max(int(request.args.get("page_size", 10)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"ok": False, "message": "page e page_size devem ser números inteiros"}), 400
     sort_by = request.args.get("sort_by", "title").strip()  # Campo padrão: título
     order = request.args.get("order", "asc").strip()  # Ordem padrão: ascendente
     category = request.args.get("category", "").strip()
+    cursor = request.args.get("cursor", "").strip()
+    view = request.args.get("view", "full").strip()
+    fields = tuple(f.strip() for f in request.args.get("fields", "").split(",") if f.strip()) or None
+
+    if view not in VIEWS:
+        return jsonify({"ok": False, "message": f"view inválida: {view}"}), 400
+    unknown = [f for f in fields or () if f not in RESULT_FIELDS]
+    if unknown:
+        return jsonify({"ok": False, "message": f"Campos desconhecidos: {', '.join(unknown)}"}), 400
+
+    # Páginas profundas por offset custam caro; além de MAX_OFFSET_PAGE,
+    # o cliente segue o next_cursor da página anterior
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort_by, order, normalize_text(search_text), category)
+        except ValueError as e:
+            return jsonify({"ok": False, "message": str(e)}), 400
+    elif page > MAX_OFFSET_PAGE:
+        return jsonify({
+            "ok": False,
+            "message": f"Use o cursor (next_cursor) para páginas além da {MAX_OFFSET_PAGE}",
+        }), 400
+
+    # A primeira página sem filtros e algumas categorias concentram o tráfego;
+    # a resposta já serializada fica em cache até a próxima geração do índice
+    cache_key = (normalize_text(search_text), category, sort_by, order, cursor or page, page_size, view, fields)
+
+    # A resposta só muda com a geração do índice: o ETag sai dos parâmetros,
+    # e um cliente com a versão atual recebe 304 sem nenhuma busca
+    etag = make_etag("convenios", generation_tag(), cache_key)
+    last_modified = generation_changed_at()
+    if not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    # Etapas medidas só quando a requisição está sendo perfilada (server.profiling)
+    profile = current_profile()
+    if profile:
+        profile.lap("params")
+    cached = convenios_cache.get(cache_key)
+    if profile:
+        profile.lap("cache_lookup")
+    if cached is not None:
+        return json_response(cached, etag, last_modified, headers={"X-Cache": "HIT"})
 
-    # Configuração do filtro e ordenação
-    filters = []
-    if category:
-        filters.append(f"cats = '{category}'")
-
-    sort = [f"{sort_by}:{order}"] if sort_by else None
-
-    # Busca principal
     try:
-        search_result = index.search(
-            search_text,
-            {
-                "limit": page_size,
-                "offset": (page - 1) * page_size,
-                "filter": " AND ".join(filters) if filters else None,
-                "sort": sort,
-                "attributesToHighlight": ["title", "content", "discounts"],  # Adicione os campos que deseja destacar
-                "highlightPreTag": "<em>",  # Tag usada para abrir o destaque
-                "highlightPostTag": "</em>",  # Tag usada para fechar o destaque
-            },
+        # Com o índice de autocompletar pronto, as sugestões não vão ao backend
+        index = autocomplete.current() if search_text else None
+        result = get_backend().search(
+            search_text, page, page_size, sort_by, order, category,
+            suggestions=0 if index is not None else SUGGESTIONS_IN_PAGE, after=after, fields=fields, view=view,
         )
-
-        total_items = search_result.get("estimatedTotalHits", 0)
-        total_pages = (total_items // page_size) + (1 if total_items % page_size else 0)
-
-        # Sugestões para autocompletar
-        suggestions = []
-        if search_text:
-            suggestion_result = index.search(
-                search_text,
-                {
-                    "limit": 5,
-                    "attributesToRetrieve": ["id", "title"],
-                },
-            )
-            suggestions = [
+        if index is not None:
+            result["suggestions"] = [
                 {"id": item["id"], "title": item["title"]}
-                for item in suggestion_result.get("hits", [])
+                for item in index.suggest(search_text, SUGGESTIONS_IN_PAGE, max_categories=0)
             ]
+        if profile:
+            profile.lap("search")
+        total_items = result["total"]
+        total_pages = None
+        if total_items is not None:
+            total_pages = (total_items // page_size) + (1 if total_items % page_size else 0)
+        next_position = result["next_position"]
 
         # Retorno final com os highlights
-        return jsonify({
-            "data": [
-                {
-                    **item,
-                    "title_highlight": item["_formatted"].get("title", item.get("title")),
-                    "content_highlight": item["_formatted"].get("content", item.get("content")),
-                    "discounts_highlight": item["_formatted"].get("discounts", item.get("discounts")),
-                }
-                for item in search_result.get("hits", [])
-            ],
-            "suggestions": suggestions,
+        body = current_app.json.dumps({
+            "data": result["hits"],
+            "suggestions": result["suggestions"],
             "page": page,
             "page_size": page_size,
             "total_items": total_items,
             "total_pages": total_pages,
+            "next_cursor": (
+                encode_cursor(sort_by, order, next_position, normalize_text(search_text), category)
+                if next_position else None
+            ),
         })
+        if profile:
+            profile.lap("serialize")
+        convenios_cache.set(cache_key, body, len(body))
+        return json_response(body, etag, last_modified, headers={"X-Cache": "MISS"})
 
     except Exception as e:
         logging.error(f"[Flask] Erro ao buscar convênios: {str(e)}")
         return jsonify({"ok": False, "data": [], "message": f"Erro ao buscar convênios: {str(e)}"}), 500
     
+def parse_since(value):
+    """Epoch em segundos a partir de um epoch ou de uma data ISO 8601 (sem fuso, em UTC)."""
+    try:
+        since = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        since = parsed.timestamp()
+    if not math.isfinite(since):
+        raise ValueError(f"since não é um número finito: {value}")
+    # Um epoch fora das datas representáveis só falharia no meio da exportação
+    try:
+        datetime.fromtimestamp(since, tz=timezone.utc)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"since fora do intervalo de datas: {value}") from e
+    return since
+
+
+@routes_bp.route("/convenios/export", methods=["GET"])
+def export_convenios():
+    """Todos os convênios em NDJSON (um por linha), transmitidos sem carregar o corpus em memória.
+
+    `since` (epoch ou ISO 8601) limita aos convênios alterados depois dessa
+    data. Com Accept-Encoding: gzip, o fluxo vai comprimido.
+    """
+    since = request.args.get("since", "").strip()
+    try:
+        since = parse_since(since) if since else None
+    except ValueError:
+        return jsonify({"ok": False, "message": f"since inválido: {since}"}), 400
+
+    backend = get_backend()
+    use_gzip = bool(request.accept_encodings["gzip"])
+
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        chunk, size = [], 0
+        for convenio in backend.export(since):
+            line = json.dumps(convenio, ensure_ascii=False, default=str) + "\n"
+            chunk.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                data = "".join(chunk).encode("utf-8")
+                chunk, size = [], 0
+                data = compressor.compress(data) if compressor else data
+                if data:
+                    yield data
+        data = "".join(chunk).encode("utf-8")
+        if compressor:
+            data = compressor.compress(data) + compressor.flush()
+        if data:
+            yield data
+
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-store"}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson", headers=headers)
+
+
 @routes_bp.route("/get_categories", methods=["GET"])
 def get_categories():
-    try:
-        index = client.index(INDEX_NAME)
-        # Recupera todas as categorias existentes
-        search_result = index.search("", {"attributesToRetrieve": ["cats"], "limit": 1000})
-        categories = set()
-        for hit in search_result.get("hits", []):
-            if "cats" in hit and hit["cats"]:
-                categories.update([cat.strip() for cat in hit["cats"].split(",")])
+    etag = make_etag("categories", generation_tag())
+    last_modified = generation_changed_at()
+    if not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    cached = categories_cache.get("categories")
+    if cached is not None:
+        return json_response(cached, etag, last_modified, headers={"X-Cache": "HIT"})
 
-        return jsonify(sorted(categories))
+    try:
+        body = current_app.json.dumps(get_backend().categories())
+        categories_cache.set("categories", body, len(body))
+        return json_response(body, etag, last_modified, headers={"X-Cache": "MISS"})
 
     except Exception as e:
         logging.error(f"[Flask] Erro ao buscar categorias: {str(e)}")
-        return jsonify([])
-    
+        return jsonify({"ok": False, "message": f"Erro ao buscar categorias: {str(e)}"}), 500
+
 
 @routes_bp.route("/convenio/<id>", methods=["GET"])
 def get_convenio_by_id(id):
     try:
-        index = client.index(INDEX_NAME)
-
-        # Busca o documento pelo ID
-        convenio = index.get_document(id)
-        
-        # Converte o objeto para um dicionário se necessário
-        convenio_dict = dict(convenio) if not isinstance(convenio, dict) else convenio
-        
-        return jsonify(convenio_dict)
+        convenio = get_backend().get_convenio(id)
+        if convenio is None:
+            return jsonify({"ok": False, "message": "Convênio não encontrado"}), 404
+        body = current_app.json.dumps(convenio)
+        # O content_hash do spider identifica a versão do documento
+        etag = make_etag("convenio", id, convenio.get("content_hash") or body)
+        return json_response(body, etag, cache_control=DETAIL_CACHE_CONTROL)
 
     except Exception as e:
         logging.error(f"[Flask] Erro ao buscar convênio por ID '{id}': {str(e)}")
-        return jsonify({"ok": False, "message": "Convênio não encontrado"}), 404
\ No newline at end of file
+        return jsonify({"ok": False, "message": f"Erro ao buscar convênio: {str(e)}"}), 500
+
+
+@routes_bp.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """Contadores de acertos e falhas do cache de respostas."""
+    return jsonify({
+        "convenios": convenios_cache.stats(),
+        "suggest": suggest_cache.stats(),
+        "categories": categories_cache.stats(),
+        "compressed": compressed_cache.stats(),
+    })
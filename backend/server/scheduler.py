@@ -0,0 +1,211 @@
+import fcntl
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from server.logging import logging
+
+# Cadência base das recoletas automáticas, em segundos; 0 desliga o agendador.
+# É também o intervalo mínimo: a adaptação nunca coleta mais do que isso.
+RECRAWL_INTERVAL = float(os.getenv("RECRAWL_INTERVAL", 0))
+# Teto do intervalo quando as coletas seguidas não encontram mudanças
+RECRAWL_MAX_INTERVAL = float(os.getenv("RECRAWL_MAX_INTERVAL", 7 * 24 * 3600))
+# Fator de multiplicação do intervalo a cada coleta sem mudanças (e de divisão
+# a cada coleta com mudanças)
+RECRAWL_BACKOFF = float(os.getenv("RECRAWL_BACKOFF", 2.0))
+# Variação aleatória do intervalo (0.1 = ±10%), para os horários não se alinharem
+RECRAWL_JITTER = float(os.getenv("RECRAWL_JITTER", 0.1))
+# De quanto em quanto tempo cada processo confere se a próxima coleta venceu
+RECRAWL_POLL_INTERVAL = float(os.getenv("RECRAWL_POLL_INTERVAL", 60))
+# Coletas recentes guardadas no estado, para consulta em GET /scrape/schedule
+RECRAWL_HISTORY = 20
+
+# Trava e estado compartilhados por todos os processos do servidor
+CRAWL_LOCK_FILE = os.getenv("CRAWL_LOCK_FILE", os.path.join(tempfile.gettempdir(), "convenios_crawl.lock"))
+# Pedido de cancelamento da coleta em andamento, visto por quem segura a trava
+CRAWL_CANCEL_FILE = f"{CRAWL_LOCK_FILE}.cancel"
+SCHEDULE_FILE = os.getenv("RECRAWL_SCHEDULE_FILE", os.path.join(tempfile.gettempdir(), "convenios_schedule.json"))
+
+
+class CrawlLock:
+    """Trava exclusiva entre processos (flock) que garante uma única coleta por vez.
+
+    Substitui a flag em memória, que só valia dentro de um processo. O
+    sistema operacional solta a trava se o processo que a segura morrer.
+    O cancelamento também passa por arquivo: qualquer processo pode pedi-lo
+    com request_cancel(), e o processo da coleta o confere com
+    cancel_requested().
+    """
+
+    def __init__(self, path=CRAWL_LOCK_FILE, cancel_path=CRAWL_CANCEL_FILE):
+        self.path = path
+        self.cancel_path = cancel_path
+        self.fd = None
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Tenta pegar a trava sem esperar; False se outra coleta a segura."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # Um pedido que chegou depois do fim da coleta anterior não vale para esta
+        self._clear_cancel()
+        with self.lock:
+            self.fd = fd
+        return True
+
+    def release(self):
+        with self.lock:
+            fd, self.fd = self.fd, None
+        if fd is not None:
+            self._clear_cancel()
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def held(self):
+        """True se alguma coleta, deste ou de outro processo, segura a trava."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+        return False
+
+    def request_cancel(self):
+        """Pede o cancelamento da coleta em andamento; False se não houver nenhuma."""
+        if not self.held():
+            return False
+        with open(self.cancel_path, "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+        return True
+
+    def cancel_requested(self):
+        return os.path.exists(self.cancel_path)
+
+    def _clear_cancel(self):
+        try:
+            os.remove(self.cancel_path)
+        except FileNotFoundError:
+            pass
+
+
+class RecrawlScheduler:
+    """Agenda recoletas incrementais com intervalo adaptativo e jitter.
+
+    Depois de cada coleta incremental, o intervalo é multiplicado por
+    RECRAWL_BACKOFF se nada mudou (nenhum convênio novo, alterado ou
+    removido) e dividido por ele se houve mudanças, entre RECRAWL_INTERVAL e
+    RECRAWL_MAX_INTERVAL. Assim a frequência acompanha o ritmo real de
+    mudanças do site. O estado (intervalo, próxima coleta e histórico) fica em
+    SCHEDULE_FILE e só é gravado por quem segura a CrawlLock, então todos os
+    processos seguem a mesma agenda.
+    """
+
+    def __init__(
+        self, path=SCHEDULE_FILE, interval=RECRAWL_INTERVAL, max_interval=RECRAWL_MAX_INTERVAL,
+        backoff=RECRAWL_BACKOFF, jitter=RECRAWL_JITTER, poll_interval=RECRAWL_POLL_INTERVAL,
+    ):
+        self.path = path
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.jitter = jitter
+        self.poll_interval = poll_interval
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("interval", self.interval)
+        state.setdefault("next_run_at", None)
+        state.setdefault("history", [])
+        # A cadência configurada pode ter mudado desde a última gravação
+        state["interval"] = min(max(state["interval"], self.interval), self.max_interval)
+        return state
+
+    def save(self, state):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def jittered(self, interval):
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def due(self, now=None):
+        """True se a próxima coleta agendada já venceu."""
+        now = time.time() if now is None else now
+        state = self.load()
+        if state["next_run_at"] is None:
+            # Primeira vez: não coleta na subida do servidor, agenda a partir de agora
+            state["next_run_at"] = now + self.jittered(state["interval"])
+            self.save(state)
+            return False
+        return now >= state["next_run_at"]
+
+    def record(self, mode, stats=None, error=None, now=None):
+        """Registra o fim de uma coleta (agendada ou manual) e agenda a próxima.
+
+        Deve ser chamado com a CrawlLock ainda presa. Só coletas incrementais
+        bem-sucedidas ajustam o intervalo: um rebuild reenvia tudo e não diz
+        nada sobre o ritmo de mudanças.
+        """
+        now = time.time() if now is None else now
+        state = self.load()
+        changed = None
+        if stats is not None and error is None:
+            changed = stats["items_indexed"] + stats["items_removed"]
+            if mode == "incremental" and changed:
+                state["interval"] = max(state["interval"] / self.backoff, self.interval)
+                state["last_changed_at"] = now
+            elif mode == "incremental":
+                state["interval"] = min(state["interval"] * self.backoff, self.max_interval)
+        state["last_run_at"] = now
+        state["next_run_at"] = now + self.jittered(state["interval"])
+        state["history"] = (state["history"] + [{
+            "at": now,
+            "mode": mode,
+            "changed": changed,
+            "error": error,
+            "interval": state["interval"],
+        }])[-RECRAWL_HISTORY:]
+        self.save(state)
+        return state
+
+    def snapshot(self):
+        return {"enabled": self.enabled, **self.load()}
+
+    def run_forever(self, start_crawl, sleep=time.sleep):
+        """Confere a agenda a cada RECRAWL_POLL_INTERVAL e dispara a coleta vencida.
+
+        `start_crawl(mode, scheduled=True)` pega a CrawlLock e confere de novo
+        se a coleta ainda está vencida, porque outro processo pode tê-la feito
+        entre a conferência e a trava.
+        """
+        if not self.enabled:
+            return
+        while True:
+            sleep(self.poll_interval)
+            try:
+                if self.due():
+                    start_crawl("incremental", scheduled=True)
+            except Exception as e:
+                logging.error(f"[Scheduler] Erro ao agendar a recoleta: {str(e)}")
+
+
+crawl_lock = CrawlLock()
+recrawl_scheduler = RecrawlScheduler()
@@ -93,8 +93,9 @@ def convenios_table():
             try:
                 r = requests.get(f"{API_URL}/progress")
                 data = r.json()
-                total_items = max(data.get("pages_crawled", 1), 1)  # Evitar divisão por zero
-                progress_bar.value = (data.get("items_scraped", 0) / total_items) * 100
+                # Total esperado vem da última coleta; sem ele, usa as páginas visitadas
+                total_items = max(data.get("expected_items") or data.get("pages_crawled", 1), 1)  # Evitar divisão por zero
+                progress_bar.value = min(data.get("items_scraped", 0) / total_items, 1) * 100
                 progress_label.text = (f"Progresso: {data.get('items_scraped', 0)} itens coletados "
                                        f"de {data.get('pages_crawled', 0)} páginas.")
                 if data.get("finished"):
@@ -0,0 +1,5 @@
+"""Ponto de entrada de produção: gunicorn -c gunicorn.conf.py server.wsgi:app"""
+
+from server.app import create_app
+
+app = create_app()
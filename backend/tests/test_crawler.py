@@ -0,0 +1,90 @@
+"""Executa um job pelo CrawlWorker contra o servidor local de listagem (benchmarks.listing_server)."""
+
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("scrapy")
+
+from benchmarks.listing_server import load_templates, make_handler  # noqa: E402
+from server.crawler import CrawlWorker  # noqa: E402
+
+PAGES = 3
+PER_PAGE = 4
+
+
+def serve_listing(pages, latency):
+    args = argparse.Namespace(pages=pages, per_page=PER_PAGE, latency=latency, slow_after=0, slow_latency=0.0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args, load_templates()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/category/convenios/"
+
+
+@pytest.fixture
+def listing_url():
+    server, url = serve_listing(PAGES, latency=0.0)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def slow_listing_url():
+    # Lento o bastante para a coleta ainda estar rodando quando o cancelamento chegar
+    server, url = serve_listing(50, latency=0.5)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def worker():
+    worker = CrawlWorker()
+    yield worker
+    worker.stop()
+
+
+def test_job_runs_to_completion(worker, listing_url):
+    events = []
+    worker.on_event(events.append)
+
+    job_id = worker.submit(
+        {
+            # Sem backend de busca: só a coleta
+            "ITEM_PIPELINES": {},
+            "DOWNLOAD_DELAY": 0,
+            "AUTOTHROTTLE_ENABLED": False,
+            "LOG_LEVEL": "ERROR",
+        },
+        timeout=60,
+        spider_args={"start_url": listing_url},
+    )
+    result = worker.wait(job_id, timeout=120)
+
+    assert result["reason"] == "finished", result.get("error")
+    assert result["stats"]["items_scraped"] == PAGES * PER_PAGE
+    assert [event["type"] for event in events if event.get("job_id") == job_id][0] == "started"
+
+
+def test_wait_cancels_the_job_when_asked(worker, slow_listing_url):
+    job_id = worker.submit(
+        {"ITEM_PIPELINES": {}, "LOG_LEVEL": "ERROR"},
+        timeout=60,
+        spider_args={"start_url": slow_listing_url},
+    )
+    # O pedido pode vir de outro processo; aqui, de uma função que diz sim
+    result = worker.wait(job_id, timeout=120, cancel_if=lambda: True)
+
+    assert result["reason"] == "cancelled"
+    assert result["stats"]["items_scraped"] < 50 * PER_PAGE
+
+
+def test_job_that_fails_to_start_reports_finished(worker):
+    # Um reactor inexistente faz o Crawler falhar antes de a coleta começar
+    job_id = worker.submit({"TWISTED_REACTOR": "nao.existe.Reactor"}, timeout=60)
+    result = worker.wait(job_id, timeout=120)
+
+    assert result["reason"] == "error"
+    assert result["error"]
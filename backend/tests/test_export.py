@@ -0,0 +1,24 @@
+"""Validação de `since` em GET /convenios/export (server.routes.parse_since)."""
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_socketio")
+
+from server.routes import parse_since  # noqa: E402
+
+
+def test_epoch_and_iso_dates():
+    assert parse_since("1700000000") == 1700000000.0
+    assert parse_since("2024-01-01T00:00:00Z") == 1704067200.0
+    assert parse_since("2024-01-01T03:00:00+03:00") == 1704067200.0
+
+
+def test_naive_iso_dates_are_utc():
+    assert parse_since("2024-01-01T00:00:00") == parse_since("2024-01-01T00:00:00Z")
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "1e300", "ontem"])
+def test_rejects_values_that_are_not_dates(value):
+    with pytest.raises(ValueError):
+        parse_since(value)
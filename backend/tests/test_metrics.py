@@ -0,0 +1,49 @@
+"""Erros do backend Postgres chegam às rotas como 500 e contam em search_backend_errors_total."""
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_socketio")
+pytest.importorskip("psycopg2")
+
+from prometheus_client import REGISTRY  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from server import database  # noqa: E402
+from server.app import create_app  # noqa: E402
+from server.backends import PostgresBackend  # noqa: E402
+from server.cache import categories_cache, convenios_cache  # noqa: E402
+
+
+def backend_errors(operation):
+    labels = {"backend": "postgres", "operation": operation}
+    return REGISTRY.get_sample_value("search_backend_errors_total", labels) or 0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Nada escuta na porta 1: toda consulta falha com OperationalError
+    monkeypatch.setattr(database, "engine", create_engine("postgresql://convenios@127.0.0.1:1/convenios"))
+    convenios_cache.clear()
+    categories_cache.clear()
+    return create_app(backend=PostgresBackend()).test_client()
+
+
+def test_failed_search_is_counted_and_not_cached(client):
+    before = backend_errors("search")
+
+    response = client.get("/convenios?search=clinica")
+
+    assert response.status_code == 500
+    assert backend_errors("search") == before + 1
+    assert convenios_cache.stats()["entries"] == 0
+
+
+def test_failed_categories_are_counted_and_not_cached(client):
+    before = backend_errors("categories")
+
+    response = client.get("/get_categories")
+
+    assert response.status_code == 500
+    assert backend_errors("categories") == before + 1
+    assert categories_cache.stats()["entries"] == 0
@@ -0,0 +1,66 @@
+"""Paginação por cursor no MeilisearchBackend além dos 1000 resultados padrão do Meilisearch."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("meilisearch")
+
+from server.backends import MeilisearchBackend  # noqa: E402
+from server.indexer import apply_index_settings  # noqa: E402
+
+DOCUMENTS = 2500
+PAGE_SIZE = 100
+
+
+class FakeMeilisearch:
+    """Imita o limite pagination.maxTotalHits: nenhuma busca passa do teto configurado."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.settings = {"pagination": {"maxTotalHits": 1000}, "faceting": {"maxValuesPerFacet": 100}}
+
+    def index(self, name):
+        return SimpleNamespace(get_settings=lambda: self.settings, update_settings=self.update_settings)
+
+    def update_settings(self, diff):
+        self.settings.update(diff)
+        return SimpleNamespace(task_uid=1)
+
+    def wait_for_task(self, task_uid, timeout_in_ms=None):
+        return SimpleNamespace(status="succeeded", type="settingsUpdate", duration=None, error=None)
+
+    def multi_search(self, queries):
+        reachable = self.documents[:self.settings["pagination"]["maxTotalHits"]]
+        results = []
+        for query in queries:
+            offset, limit = query.get("offset", 0), query["limit"]
+            hits = [dict(document) for document in reachable[offset:offset + limit]]
+            results.append({"hits": hits, "estimatedTotalHits": len(reachable)})
+        return {"results": results}
+
+
+def walk(backend):
+    seen, after = [], None
+    while True:
+        result = backend.search("", 1, PAGE_SIZE, "title", "asc", None, after=after, fields=["id", "title"])
+        seen.extend(hit["id"] for hit in result["hits"])
+        after = result["next_position"]
+        if after is None:
+            return seen
+
+
+def test_cursor_walk_stops_at_the_default_max_total_hits():
+    client = FakeMeilisearch([{"id": str(n), "title": f"Convênio {n}"} for n in range(DOCUMENTS)])
+
+    assert len(walk(MeilisearchBackend(client, "convenios"))) == 1000
+
+
+def test_index_settings_let_the_cursor_walk_past_1000_hits():
+    client = FakeMeilisearch([{"id": str(n), "title": f"Convênio {n}"} for n in range(DOCUMENTS)])
+    apply_index_settings(client, "convenios")
+
+    seen = walk(MeilisearchBackend(client, "convenios"))
+
+    assert len(seen) == DOCUMENTS
+    assert len(set(seen)) == DOCUMENTS
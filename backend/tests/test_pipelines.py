@@ -0,0 +1,36 @@
+"""Remoção dos convênios ausentes ao fim de uma coleta (myspider_project.pipelines.removed_ids)."""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("scrapy")
+pytest.importorskip("meilisearch")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "myspider_project"))
+
+from myspider_project.pipelines import removed_ids  # noqa: E402
+
+EXISTING = {"a": "hash-a", "b": "hash-b", "c": "hash-c"}
+
+
+def spider(failed_convenios=(), failed_listings=0):
+    return SimpleNamespace(failed_convenios=set(failed_convenios), failed_listings=failed_listings)
+
+
+def test_removes_convenios_that_were_not_seen():
+    assert removed_ids(EXISTING, {"a"}, spider(), "finished") == ["b", "c"]
+
+
+def test_keeps_convenios_whose_detail_page_failed():
+    assert removed_ids(EXISTING, {"a"}, spider(failed_convenios={"b"}), "finished") == ["c"]
+
+
+def test_keeps_everything_when_a_listing_page_failed():
+    assert removed_ids(EXISTING, {"a"}, spider(failed_listings=1), "finished") is None
+
+
+def test_keeps_everything_when_the_crawl_did_not_finish():
+    assert removed_ids(EXISTING, {"a"}, spider(), "cancelled") is None
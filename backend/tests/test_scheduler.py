@@ -0,0 +1,28 @@
+"""Intervalo adaptativo das recoletas (server.scheduler.RecrawlScheduler)."""
+
+from server.scheduler import RecrawlScheduler
+
+
+def summary(indexed=0, removed=0):
+    return {"items_indexed": indexed, "items_removed": removed}
+
+
+def scheduler(tmp_path):
+    return RecrawlScheduler(path=str(tmp_path / "schedule.json"), interval=100, max_interval=1000, jitter=0)
+
+
+def test_interval_grows_while_nothing_changes(tmp_path):
+    recrawl = scheduler(tmp_path)
+
+    assert recrawl.record("incremental", summary(), now=0)["interval"] == 200
+    assert recrawl.record("incremental", summary(), now=1)["interval"] == 400
+
+
+def test_removed_convenios_count_as_changes(tmp_path):
+    recrawl = scheduler(tmp_path)
+    recrawl.record("incremental", summary(), now=0)
+
+    state = recrawl.record("incremental", summary(removed=3), now=1)
+
+    assert state["interval"] == 100
+    assert state["history"][-1]["changed"] == 3
@@ -24,7 +24,8 @@ const ScrapyProgress = ({ isRunning, setIsRunning }: ScrapyProgressProps) => {
   const MAX_VISIBLE_LOGS = 5; // Limite de mensagens visíveis
 
   useEffect(() => {
-    const socket: Socket = io(SOCKET_SERVER_URL);
+    // Só WebSocket: dispensa sessão fixa quando o backend roda com vários processos
+    const socket: Socket = io(SOCKET_SERVER_URL, { transports: ["websocket"] });
 
     socket.on("scrapy_progress", (data: { message: string }) => {
       setLogs((prevLogs) => {
@@ -30,6 +30,9 @@ import {
 } from "@/components/ui/dropdown-menu";
 import { Input } from "@/components/ui/input";
 
+// Deve acompanhar MAX_OFFSET_PAGE em backend/server/pagination.py
+const MAX_OFFSET_PAGE = 10;
+
 export default function HomePage() {
   const queryClient = useQueryClient();
   const { params, updateParams, clearParams } = useUrlQueryParams({
@@ -48,6 +51,20 @@ export default function HomePage() {
   const { search, page, pageSize, sortBy, order, category } = params;
   const [isRunning, setIsRunning] = useState(false);
 
+  // Cursores já recebidos para cada página; além de MAX_OFFSET_PAGE a API
+  // só pagina por cursor
+  const cursorsKey = [search, pageSize, sortBy, order, category].join("|");
+  const cursors = useRef<{ key: string; pages: Record<number, string> }>({
+    key: cursorsKey,
+    pages: {},
+  });
+  if (cursors.current.key !== cursorsKey) {
+    cursors.current = { key: cursorsKey, pages: {} };
+  }
+  const currentPage = parseInt(page);
+  const cursor =
+    currentPage > MAX_OFFSET_PAGE ? cursors.current.pages[currentPage] : undefined;
+
   const {
     data: conveniosData,
     isLoading: conveniosLoading,
@@ -55,8 +72,21 @@ export default function HomePage() {
     error: conveniosErrorObj,
   } = useQuery({
     queryKey: ["convenios", search, page, pageSize, sortBy, order, category],
-    queryFn: () =>
-      fetchConvenios(search, page, pageSize, sortBy, order, category),
+    queryFn: async () => {
+      const data = await fetchConvenios(
+        search,
+        page,
+        pageSize,
+        sortBy,
+        order,
+        category,
+        cursor
+      );
+      if (data.next_cursor) {
+        cursors.current.pages[currentPage + 1] = data.next_cursor;
+      }
+      return data;
+    },
   });
 
   const { data: categories, isLoading: categoriesLoading } = useQuery({
@@ -99,7 +129,16 @@ export default function HomePage() {
     }
   }, [searchRef.current, search]);
 
-  const totalPages = conveniosData?.total_pages || 1;
+  const [totalPages, setTotalPages] = useState(1);
+  useEffect(() => {
+    // Páginas por cursor não trazem o total; mantém o da primeira página
+    if (conveniosData?.total_pages != null) {
+      setTotalPages(conveniosData.total_pages || 1);
+    }
+  }, [conveniosData]);
+
+  const isReachable = (target: number) =>
+    target <= MAX_OFFSET_PAGE || target in cursors.current.pages;
 
   return (
     <div className="container mx-auto py-10">
@@ -138,12 +177,12 @@ export default function HomePage() {
               Todas as categorias
             </DropdownMenuItem>
             {!categoriesLoading &&
-              categories.map((cat: string) => (
+              categories.map((cat: Categoria) => (
                 <DropdownMenuItem
-                  key={cat}
-                  onSelect={() => updateParams({ category: cat, page: 1 })}
+                  key={cat.name}
+                  onSelect={() => updateParams({ category: cat.name, page: 1 })}
                 >
-                  {cat}
+                  {cat.name} ({cat.count})
                 </DropdownMenuItem>
               ))}
           </DropdownMenuContent>
@@ -238,6 +277,7 @@ export default function HomePage() {
                       }
                       return i >= currentPage - 3 && i < currentPage + 2;
                     })
+                    .filter((i) => isReachable(i + 1))
                     .map((i) => (
                       <PaginationItem key={i}>
                         <PaginationLink
@@ -255,11 +295,12 @@ export default function HomePage() {
                   <PaginationItem>
                     <PaginationNext
                       href="#"
-                      onClick={() =>
-                        updateParams({
-                          page: Math.min(parseInt(page) + 1, totalPages),
-                        })
-                      }
+                      onClick={() => {
+                        const next = Math.min(parseInt(page) + 1, totalPages);
+                        if (isReachable(next)) {
+                          updateParams({ page: next });
+                        }
+                      }}
                     />
                   </PaginationItem>
                 </PaginationContent>
@@ -6,9 +6,16 @@ interface Convenio {
   url: string;
   image: string;
   title_highlight: string;
-  content_highlight: string;
+  content_highlight?: string;
   discounts_highlight: string;
   discounts: string;
+  // Trecho do texto em volta dos termos buscados (view=list)
+  snippet?: string;
+}
+
+interface Categoria {
+  name: string;
+  count: number;
 }
 
 interface ProgressData {
@@ -8,10 +8,13 @@ export const fetchConvenios = async (
   page_size: number,
   sort_by: string,
   order: string,
-  category?: string
+  category?: string,
+  cursor?: string,
+  view: "list" | "full" = "list",
+  fields?: string
 ) => {
   const response = await axios.get(`${API_URL}/convenios`, {
-    params: { search, page, page_size, sort_by, order, category },
+    params: { search, page, page_size, sort_by, order, category, cursor, view, fields },
   });
   return response.data;
 };
@@ -26,11 +29,36 @@ export async function fetchConvenioById(id: string) {
   return response.data;
 }
 
+// Segue o next_cursor até o fim: a API limita o page_size a 100
 export async function fetchConveniosByCategory(cat: string) {
-  return await fetchConvenios("", 1, 1000, "title", "asc", cat);
+  const data: Convenio[] = [];
+  let cursor: string | undefined;
+  do {
+    const result = await fetchConvenios(
+      "",
+      1,
+      100,
+      "title",
+      "asc",
+      cat,
+      cursor,
+      "list",
+      "id,title,date,cats,image,text"
+    );
+    data.push(...result.data);
+    cursor = result.next_cursor ?? undefined;
+  } while (cursor);
+  return { data };
 }
 
 export const fetchCategories = async () => {
   const response = await axios.get(`${API_URL}/get_categories`);
   return response.data;
 };
+
+export const fetchSuggestions = async (q: string, limit = 5) => {
+  const response = await axios.get(`${API_URL}/suggest`, {
+    params: { q, limit },
+  });
+  return response.data;
+};